@@ -1,6 +1,5 @@
 import streamlit as st
 from pipeline_graph import create_agent_graph, AgentState
-import time
 from visualization import AgentVisualizer
 
 # Configure Streamlit page
@@ -11,15 +10,18 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def get_compiled_graph():
+    """Build and compile the agent graph once per server process."""
+    return create_agent_graph().compile()
+
 # Initialize session state
 if 'graph' not in st.session_state:
-    st.session_state.graph = create_agent_graph().compile()
+    st.session_state.graph = get_compiled_graph()
 if 'visualizer' not in st.session_state:
     st.session_state.visualizer = AgentVisualizer()
 if 'animation_running' not in st.session_state:
     st.session_state.animation_running = False
-if 'current_frame' not in st.session_state:
-    st.session_state.current_frame = 0
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 if 'last_transitions' not in st.session_state:
@@ -40,7 +42,6 @@ with st.sidebar:
     if st.button("Reset Animation"):
         st.session_state.animation_running = False
         st.session_state.visualizer = AgentVisualizer()
-        st.session_state.current_frame = 0
         st.session_state.messages = []
         st.session_state.last_transitions = []
 
@@ -96,7 +97,6 @@ with col2:
                     flow_sequence = [[edge] for edge in transitions]
                     st.session_state.visualizer.animate_flow(flow_sequence)
                     st.session_state.animation_running = True
-                    st.session_state.current_frame = 0
                     st.rerun()
 
 # Agent Pipeline Visualization in the left column
@@ -108,13 +108,10 @@ with col1:
     
     animation_placeholder = st.empty()
     
-    # Real-time animation while LLM is processing or after
+    # The figure carries every frame and plays them in the browser
     if st.session_state.animation_running:
-        frame = st.session_state.visualizer.animation_frames[st.session_state.current_frame]
-        animation_placeholder.plotly_chart(frame, use_container_width=True, config={'displayModeBar': False})
-        st.session_state.current_frame = (st.session_state.current_frame + 1) % len(st.session_state.visualizer.animation_frames)
-        time.sleep(0.1)
-        st.rerun()
+        figure = st.session_state.visualizer.animation_figure
+        animation_placeholder.plotly_chart(figure, use_container_width=True, config={'displayModeBar': False})
     
     # --- DEBUG: Show static org chart ---
     st.markdown("#### Static Organization Chart (Debug)")
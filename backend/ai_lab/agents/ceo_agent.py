@@ -69,6 +69,9 @@ Available next steps:
 Provide clear, professional responses that demonstrate strategic thinking and leadership."""),
             ("human", "{context}\n\nRequest: {message}")
         ])
+        
+        # Formatted once so every call sends a byte-identical system prompt
+        self.org_structure_text = self._format_organization_for_prompt()
     
     def _format_organization_for_prompt(self) -> str:
         """Format the organization structure for the prompt."""
@@ -94,12 +97,9 @@ Provide clear, professional responses that demonstrate strategic thinking and le
             if self.conversation_manager and session_id:
                 context = self.conversation_manager.get_context(session_id)
             
-            # Format the organization structure
-            org_structure = self._format_organization_for_prompt()
-            
             # Create the formatted prompt
             formatted_prompt = self.prompt.format_messages(
-                org_structure=org_structure,
+                org_structure=self.org_structure_text,
                 context=context,
                 message=message
             )
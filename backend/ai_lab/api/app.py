@@ -3,14 +3,15 @@ FastAPI application with WebSocket support for real-time agent communication.
 """
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends
-from fastapi.middleware.cors import CORSMiddleware
+from ..middleware import FastCORS, cors_origins_from_env
+from ..responses import ORJSONResponse
 from typing import Dict, List, Optional
 import asyncio
 import json
 import logging
 from datetime import datetime
 
-from ..models.base import AgentMessage, AgentStatus, SystemConfig
+from ..models.base import AgentMessage, AgentStatus, MessageType, SystemConfig
 from ..core.message_broker import MessageBroker
 from ..core.database import DatabaseManager
 from ..core.gpu_manager import GPUManager
@@ -39,9 +40,11 @@ class ConnectionManager:
             del self.active_connections[client_id]
             logger.info(f"Client disconnected: {client_id}")
     
-    async def broadcast(self, message: dict):
-        """Broadcast a message to all connected clients."""
+    async def broadcast(self, message: dict, exclude: Optional[WebSocket] = None):
+        """Broadcast a message to all connected clients except exclude."""
         for connection in self.active_connections.values():
+            if connection is exclude:
+                continue
             try:
                 await connection.send_json(message)
             except Exception as e:
@@ -67,17 +70,12 @@ class ConnectionManager:
 app = FastAPI(
     title="AI-Lab API",
     description="API for AI-Lab multi-agent system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure based on your security requirements
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(FastCORS, origins=cors_origins_from_env())  # Configure CORS_ORIGINS based on your security requirements
 
 # Initialize managers
 config_manager = ConfigManager()
@@ -113,39 +111,71 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"Error during shutdown: {str(e)}")
 
+async def handle_client_message(websocket: WebSocket, data: dict) -> Optional[dict]:
+    """
+    Handle one message received from a WebSocket client.
+    
+    Args:
+        websocket: Connection the message arrived on
+        data: Decoded message; "type" selects the action
+        
+    Returns:
+        Optional[dict]: Reply for the sending client, if any
+    """
+    if data.get("type") == "agent_message":
+        # "type" names the frame, so the message's own type travels as "message_type"
+        fields = {key: value for key, value in data.items() if key not in ("type", "message_type")}
+        message = AgentMessage(type=data.get("message_type", MessageType.TASK), **fields)
+        await message_broker.publish(message)
+        
+        payload = message.model_dump(mode="json")
+        payload["message_type"] = payload["type"]
+        payload["type"] = "agent_message"
+        
+        # Broadcast to relevant clients
+        if message.receiver_id:
+            await connection_manager.send_to_agent(str(message.receiver_id), payload)
+            return None
+        # The sender's copy goes back as its reply
+        await connection_manager.broadcast(payload, exclude=websocket)
+        return payload
+    
+    if data.get("type") == "register_agent":
+        # Register agent connection
+        agent_id = data.get("agent_id")
+        if agent_id:
+            connection_manager.register_agent(agent_id, websocket)
+            return {
+                "type": "registration_confirmed",
+                "agent_id": agent_id
+            }
+    
+    return None
+
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    """WebSocket endpoint for real-time communication."""
+    """
+    WebSocket endpoint for real-time communication.
+    
+    A {"type": "batch", "messages": [...]} frame handles its messages in order
+    and answers with a single frame holding the list of their replies.
+    """
     await connection_manager.connect(websocket, client_id)
     try:
         while True:
             data = await websocket.receive_json()
             
-            # Handle different message types
-            if "type" in data:
-                if data["type"] == "agent_message":
-                    # Forward message to message broker
-                    message = AgentMessage(**data)
-                    await message_broker.publish(message)
-                    
-                    # Broadcast to relevant clients
-                    if message.receiver_id:
-                        await connection_manager.send_to_agent(
-                            str(message.receiver_id),
-                            message.model_dump()
-                        )
-                    else:
-                        await connection_manager.broadcast(message.model_dump())
-                
-                elif data["type"] == "register_agent":
-                    # Register agent connection
-                    agent_id = data.get("agent_id")
-                    if agent_id:
-                        connection_manager.register_agent(agent_id, websocket)
-                        await websocket.send_json({
-                            "type": "registration_confirmed",
-                            "agent_id": agent_id
-                        })
+            if data.get("type") == "batch":
+                replies = []
+                for item in data.get("messages", []):
+                    reply = await handle_client_message(websocket, item)
+                    if reply is not None:
+                        replies.append(reply)
+                await websocket.send_json(replies)
+            else:
+                reply = await handle_client_message(websocket, data)
+                if reply is not None:
+                    await websocket.send_json(reply)
     
     except WebSocketDisconnect:
         connection_manager.disconnect(client_id)
@@ -225,6 +255,8 @@ async def start_agent(agent_id: str):
         agent.state = AgentState.EXECUTING
         agent.last_updated = datetime.utcnow()
         await db_manager.update_agent_status(agent)
+        # Commit before replying so the next read sees it and failures surface here
+        await db_manager.flush()
 
         # TODO: Integrate with agent pipeline to actually start processing
         return agent.model_dump()
@@ -245,6 +277,8 @@ async def stop_agent(agent_id: str):
         agent.state = AgentState.IDLE
         agent.last_updated = datetime.utcnow()
         await db_manager.update_agent_status(agent)
+        # Commit before replying so the next read sees it and failures surface here
+        await db_manager.flush()
 
         # TODO: Integrate with agent pipeline to actually stop processing
         return agent.model_dump()
@@ -266,6 +300,8 @@ async def restart_agent(agent_id: str):
         agent.state = AgentState.EXECUTING
         agent.last_updated = datetime.utcnow()
         await db_manager.update_agent_status(agent)
+        # Commit before replying so the next read sees it and failures surface here
+        await db_manager.flush()
 
         # TODO: Integrate with agent pipeline for restart logic
         return agent.model_dump()
@@ -69,6 +69,13 @@ class SecurityConfig(BaseModel):
     jwt_algorithm: str = "HS256"
     jwt_expire_minutes: int = 60
 
+class ServerConfig(BaseModel):
+    """API server configuration settings."""
+    host: str = "0.0.0.0"
+    port: int = 8000
+    reload: bool = False
+    workers: int = 1
+
 class SystemConfig(BaseModel):
     """Main system configuration."""
     database: DatabaseConfig = Field(default_factory=DatabaseConfig)
@@ -77,6 +84,7 @@ class SystemConfig(BaseModel):
     ollama: OllamaConfig = Field(default_factory=OllamaConfig)
     logging: LoggingConfig = Field(default_factory=LoggingConfig)
     security: SecurityConfig = Field(default_factory=SecurityConfig)
+    server: ServerConfig = Field(default_factory=ServerConfig)
     
     @validator("security")
     def validate_security(cls, v: SecurityConfig) -> SecurityConfig:
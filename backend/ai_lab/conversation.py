@@ -5,15 +5,42 @@ Conversation history and context management.
 from typing import Dict, List, Optional
 from datetime import datetime
 import json
+import os
 from pathlib import Path
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+def context_window_start(count: int, max_messages: int) -> int:
+    """
+    Index of the first history message to include in the prompt context.
+    
+    The window start only moves in steps of max_messages, so between steps the
+    context grows append-only and consecutive prompts share a byte-identical
+    prefix the model server can reuse from its KV cache. Once the history is
+    long enough the window holds max_messages to 2 * max_messages - 1 messages.
+    """
+    if count <= max_messages:
+        return 0
+    return (count - max_messages) // max_messages * max_messages
+
 class ConversationManager:
     def __init__(self, history_dir: str = "conversations"):
         self.history_dir = Path(history_dir)
         self.history_dir.mkdir(exist_ok=True)
+        # Serialises read-append-write per session; agents may add messages
+        # for the same session from different threads
+        self._session_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        
+    def _session_lock(self, session_id: str) -> threading.Lock:
+        """Get the lock guarding a session's history file."""
+        with self._locks_guard:
+            lock = self._session_locks.get(session_id)
+            if lock is None:
+                lock = self._session_locks[session_id] = threading.Lock()
+            return lock
         
     def _get_conversation_file(self, session_id: str) -> Path:
         """Get the path to the conversation file for a session."""
@@ -34,19 +61,23 @@ class ConversationManager:
     def add_message(self, session_id: str, role: str, content: str, thought_process: Optional[str] = None):
         """Add a message to the conversation history."""
         try:
-            history = self.get_history(session_id)
-            message = {
-                "role": role,
-                "content": content,
-                "thought_process": thought_process,
-                "timestamp": datetime.now().isoformat()
-            }
-            history.append(message)
-            
-            # Save updated history
-            history_file = self._get_conversation_file(session_id)
-            with open(history_file, "w") as f:
-                json.dump(history, f, indent=2)
+            with self._session_lock(session_id):
+                history = self.get_history(session_id)
+                message = {
+                    "role": role,
+                    "content": content,
+                    "thought_process": thought_process,
+                    "timestamp": datetime.now().isoformat()
+                }
+                history.append(message)
+                
+                # Save updated history; the rename is atomic, so readers never
+                # see a truncated file
+                history_file = self._get_conversation_file(session_id)
+                tmp_file = history_file.with_name(f"{history_file.name}.{threading.get_ident()}.tmp")
+                with open(tmp_file, "w") as f:
+                    json.dump(history, f, indent=2)
+                os.replace(tmp_file, history_file)
                 
         except Exception as e:
             logger.error(f"Error adding message to history: {str(e)}")
@@ -57,8 +88,8 @@ class ConversationManager:
         if not history:
             return ""
         
-        # Get the most recent messages
-        recent_messages = history[-max_messages:]
+        # Get the recent messages, keeping the prompt prefix stable between turns
+        recent_messages = history[context_window_start(len(history), max_messages):]
         
         # Format the context
         context = "Recent conversation history:\n\n"
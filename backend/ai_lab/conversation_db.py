@@ -6,7 +6,9 @@ Replaces JSON file storage with PostgreSQL.
 from typing import Dict, List, Optional
 from datetime import datetime
 import logging
+from sqlalchemy.ext.asyncio import AsyncSession
 from .database import db_manager
+from .conversation import context_window_start
 
 logger = logging.getLogger(__name__)
 
@@ -31,14 +33,29 @@ class ConversationManagerDB:
         except Exception as e:
             logger.error(f"Error adding message to history: {str(e)}")
     
+    async def add_messages(
+        self,
+        session_id: str,
+        messages: List[Dict],
+        session: Optional[AsyncSession] = None
+    ):
+        """Add several messages to the conversation history in one write."""
+        try:
+            await self.db.add_conversation_messages(
+                [{"session_id": session_id, **message} for message in messages],
+                session=session
+            )
+        except Exception as e:
+            logger.error(f"Error adding messages to history: {str(e)}")
+    
     async def get_context(self, session_id: str, max_messages: int = 5) -> str:
         """Get formatted context from recent conversation history."""
         history = await self.get_history(session_id)
         if not history:
             return ""
         
-        # Get the most recent messages
-        recent_messages = history[-max_messages:]
+        # Get the recent messages, keeping the prompt prefix stable between turns
+        recent_messages = history[context_window_start(len(history), max_messages):]
         
         # Format the context
         context = "Recent conversation history:\n\n"
@@ -63,10 +80,20 @@ class ConversationManagerDB:
         except Exception as e:
             logger.error(f"Error clearing conversation history: {str(e)}")
     
-    async def save_agent_state(self, session_id: str, message: str, status: str, feedback: str, thought_process: str):
+    async def save_agent_state(
+        self,
+        session_id: str,
+        message: str,
+        status: str,
+        feedback: str,
+        thought_process: str,
+        session: Optional[AsyncSession] = None
+    ):
         """Save agent state to database."""
         try:
-            await self.db.save_agent_state(session_id, message, status, feedback, thought_process)
+            await self.db.save_agent_state(
+                session_id, message, status, feedback, thought_process, session=session
+            )
         except Exception as e:
             logger.error(f"Error saving agent state: {str(e)}")
     
@@ -4,13 +4,31 @@ Implements a robust state management system with proper indexing and querying.
 """
 
 import asyncio
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
 import aiosqlite
 from pathlib import Path
+import logging
 
 from ..models.base import AgentStatus, AgentMetrics, AgentRole, AgentState
 
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_epoch_us(value: datetime) -> int:
+    """Convert a UTC datetime to integer microseconds since the epoch."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_epoch_us(value: int) -> datetime:
+    """Convert integer microseconds since the epoch to a naive UTC datetime."""
+    return _EPOCH + timedelta(microseconds=value)
+
 
 class DatabaseManager:
     """SQLite database manager for agent state tracking."""
@@ -19,6 +37,13 @@ class DatabaseManager:
         self.db_path = db_path
         self._lock = asyncio.Lock()
         self._conn: Optional[aiosqlite.Connection] = None
+        self._write_queue: Optional[asyncio.Queue] = None
+        # Statuses from a batch whose commit failed, retried with the next batch
+        self._retry_statuses: Dict[str, AgentStatus] = {}
+        self._batch_lock = asyncio.Lock()
+        self._flusher_task: Optional[asyncio.Task] = None
+        self._flush_interval = 0.05  # Seconds between batched status commits
+        self._write_batch_size = 500
 
     async def connect(self) -> None:
         """Connect to the SQLite database and initialize tables."""
@@ -34,9 +59,16 @@ class DatabaseManager:
                 # Enable foreign keys
                 await self._conn.execute("PRAGMA foreign_keys = ON")
 
+                # Let deletions release pages; only takes effect before the first table exists
+                await self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
                 # Create tables
                 await self._create_tables()
 
+                # Status updates are queued and committed in batches
+                self._write_queue = asyncio.Queue(maxsize=10_000)
+                self._flusher_task = asyncio.create_task(self._flusher())
+
             except Exception as e:
                 raise ConnectionError(f"Failed to connect to database: {str(e)}")
 
@@ -67,7 +99,7 @@ class DatabaseManager:
                 agent_id TEXT NOT NULL,
                 state TEXT NOT NULL,
                 current_task TEXT,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_updated INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER) * 1000000),
                 FOREIGN KEY (agent_id) REFERENCES agents(id) ON DELETE CASCADE
             )
         """
@@ -85,12 +117,27 @@ class DatabaseManager:
                 average_response_time REAL DEFAULT 0.0,
                 gpu_utilization REAL DEFAULT 0.0,
                 memory_usage REAL DEFAULT 0.0,
-                last_heartbeat TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_heartbeat INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER) * 1000000),
                 FOREIGN KEY (agent_id) REFERENCES agents(id) ON DELETE CASCADE
             )
         """
         )
 
+        # Migrate ISO-string timestamps from older databases to epoch microseconds
+        for table, column in (("agent_states", "last_updated"), ("agent_metrics", "last_heartbeat")):
+            async with self._conn.execute(
+                f"SELECT id, {column} FROM {table} WHERE typeof({column}) = 'text'"
+            ) as cursor:
+                legacy_rows = await cursor.fetchall()
+            if legacy_rows:
+                await self._conn.executemany(
+                    f"UPDATE {table} SET {column} = ? WHERE id = ?",
+                    [
+                        (_to_epoch_us(datetime.fromisoformat(value)), row_id)
+                        for row_id, value in legacy_rows
+                    ],
+                )
+
         # Create indexes
         await self._conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_states_agent_id ON agent_states(agent_id)")
         await self._conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_metrics_agent_id ON agent_metrics(agent_id)")
@@ -99,82 +146,162 @@ class DatabaseManager:
 
     async def disconnect(self) -> None:
         """Disconnect from the database."""
-        async with self._lock:
-            if self._conn:
-                await self._conn.close()
-                self._conn = None
+        if self._flusher_task:
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except asyncio.CancelledError:
+                pass
+            self._flusher_task = None
+        try:
+            # Raises if the last queued statuses can't be committed
+            await self.flush()
+        finally:
+            async with self._lock:
+                if self._conn:
+                    await self._conn.close()
+                    self._conn = None
 
     async def update_agent_status(self, status: AgentStatus) -> None:
         """
-        Update the status of an agent.
+        Queue an agent status update.
+
+        Updates are written by a background task in batched transactions;
+        a batch whose commit fails is kept and retried with the next one.
+        Call ``flush`` to wait until queued updates are committed; it raises
+        if they can't be.
 
         Args:
             status: The new agent status
         """
-        async with self._lock:
-            if not self._conn:
-                raise RuntimeError("Database not connected")
+        if not self._conn or self._write_queue is None:
+            raise RuntimeError("Database not connected")
 
+        await self._write_queue.put(status)
+
+    async def flush(self) -> None:
+        """Commit all queued agent status updates, raising if a commit fails."""
+        if self._write_queue is None:
+            return
+        # Always take one batch turn: it waits for a batch already in flight,
+        # and retries it here if its commit failed
+        await self._write_batch()
+        while self._retry_statuses or not self._write_queue.empty():
+            await self._write_batch()
+
+    async def _flusher(self) -> None:
+        """Background task that periodically commits queued status updates."""
+        while True:
+            await asyncio.sleep(self._flush_interval)
             try:
-                # Update or insert agent
-                await self._conn.execute(
-                    """
-                    INSERT OR REPLACE INTO agents (id, role, name, description, updated_at)
-                    VALUES (?, ?, ?, ?, ?)
-                """,
-                    (
-                        str(status.id),
-                        status.role.value,
-                        status.role.name,
-                        f"{status.role.value} agent",
-                        datetime.utcnow(),
-                    ),
-                )
+                # Shielded so disconnect() can't cancel a batch mid-commit
+                await asyncio.shield(self._write_batch())
+            except Exception as e:
+                logger.error(f"Failed to update agent status: {str(e)}")
 
-                # Update agent state
-                await self._conn.execute(
-                    """
-                    INSERT OR REPLACE INTO agent_states
-                    (id, agent_id, state, current_task, last_updated)
-                    VALUES (?, ?, ?, ?, ?)
-                """,
-                    (
-                        f"state_{status.id}",
-                        str(status.id),
-                        status.state.value,
-                        status.current_task,
-                        status.last_updated,
-                    ),
-                )
+    async def _write_batch(self) -> None:
+        """Drain up to one batch of queued statuses and commit them together.
 
-                # Update metrics
-                metrics = status.metrics
-                await self._conn.execute(
-                    """
-                    INSERT OR REPLACE INTO agent_metrics
-                    (id, agent_id, messages_processed, tasks_completed,
-                     errors_encountered, average_response_time, gpu_utilization,
-                     memory_usage, last_heartbeat)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    (
-                        f"metrics_{status.id}",
-                        str(status.id),
-                        metrics.messages_processed,
-                        metrics.tasks_completed,
-                        metrics.errors_encountered,
-                        metrics.average_response_time,
-                        metrics.gpu_utilization,
-                        metrics.memory_usage,
-                        metrics.last_heartbeat,
-                    ),
+        Batches run one at a time, so a caller waits for any batch the
+        background flusher already has in flight.
+        """
+        async with self._batch_lock:
+            # Previously failed statuses go first; later updates for the same
+            # agent supersede earlier ones
+            pending, self._retry_statuses = self._retry_statuses, {}
+            drained = 0
+            while drained < self._write_batch_size and not self._write_queue.empty():
+                status = self._write_queue.get_nowait()
+                pending[str(status.id)] = status
+                drained += 1
+
+            if not pending:
+                return
+
+            try:
+                async with self._lock:
+                    if not self._conn:
+                        raise RuntimeError("Database not connected")
+
+                    try:
+                        await self._write_statuses(list(pending.values()))
+                        await self._conn.commit()
+                    except Exception:
+                        await self._conn.rollback()
+                        raise
+            except Exception:
+                # Keep the batch for the next attempt
+                self._retry_statuses = pending
+                raise
+            finally:
+                for _ in range(drained):
+                    self._write_queue.task_done()
+
+    async def _write_statuses(self, statuses: List[AgentStatus]) -> None:
+        """Upsert agents, states and metrics for a batch of statuses."""
+        now = datetime.utcnow()
+
+        # Update or insert agents
+        await self._conn.executemany(
+            """
+            INSERT OR REPLACE INTO agents (id, role, name, description, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """,
+            [
+                (
+                    str(status.id),
+                    status.role.value,
+                    status.role.name,
+                    f"{status.role.value} agent",
+                    now,
                 )
+                for status in statuses
+            ],
+        )
 
-                await self._conn.commit()
+        # Update agent states
+        await self._conn.executemany(
+            """
+            INSERT OR REPLACE INTO agent_states
+            (id, agent_id, state, current_task, last_updated)
+            VALUES (?, ?, ?, ?, ?)
+        """,
+            [
+                (
+                    f"state_{status.id}",
+                    str(status.id),
+                    status.state.value,
+                    status.current_task,
+                    _to_epoch_us(status.last_updated),
+                )
+                for status in statuses
+            ],
+        )
 
-            except Exception as e:
-                await self._conn.rollback()
-                raise RuntimeError(f"Failed to update agent status: {str(e)}")
+        # Update metrics
+        await self._conn.executemany(
+            """
+            INSERT OR REPLACE INTO agent_metrics
+            (id, agent_id, messages_processed, tasks_completed,
+             errors_encountered, average_response_time, gpu_utilization,
+             memory_usage, last_heartbeat)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+            [
+                (
+                    f"metrics_{status.id}",
+                    str(status.id),
+                    status.metrics.messages_processed,
+                    status.metrics.tasks_completed,
+                    status.metrics.errors_encountered,
+                    status.metrics.average_response_time,
+                    status.metrics.gpu_utilization,
+                    status.metrics.memory_usage,
+                    _to_epoch_us(status.metrics.last_heartbeat),
+                )
+                for status in statuses
+            ],
+        )
 
     async def get_agent_status(self, agent_id: str) -> Optional[AgentStatus]:
         """
@@ -244,9 +371,9 @@ class DatabaseManager:
                         average_response_time=metrics[3],
                         gpu_utilization=metrics[4],
                         memory_usage=metrics[5],
-                        last_heartbeat=datetime.fromisoformat(metrics[6]),
+                        last_heartbeat=_from_epoch_us(metrics[6]),
                     ),
-                    last_updated=datetime.fromisoformat(state[2]),
+                    last_updated=_from_epoch_us(state[2]),
                 )
 
             except Exception as e:
@@ -296,9 +423,9 @@ class DatabaseManager:
                                 average_response_time=row[10],
                                 gpu_utilization=row[11],
                                 memory_usage=row[12],
-                                last_heartbeat=datetime.fromisoformat(row[13]),
+                                last_heartbeat=_from_epoch_us(row[13]),
                             ),
-                            last_updated=datetime.fromisoformat(row[6]),
+                            last_updated=_from_epoch_us(row[6]),
                         )
                     )
 
@@ -307,6 +434,21 @@ class DatabaseManager:
             except Exception as e:
                 raise RuntimeError(f"Failed to get agent statuses: {str(e)}")
 
+    async def optimize(self) -> None:
+        """Refresh query planner statistics and release pages freed by deletions."""
+        async with self._lock:
+            if not self._conn:
+                raise RuntimeError("Database not connected")
+
+            try:
+                await self._conn.execute("PRAGMA optimize")
+                # Frees one page per step, so step through to the end
+                async with self._conn.execute("PRAGMA incremental_vacuum") as cursor:
+                    await cursor.fetchall()
+                await self._conn.commit()
+            except Exception as e:
+                raise RuntimeError(f"Failed to optimize database: {str(e)}")
+
     async def cleanup_inactive_agents(self, max_age_hours: int = 24) -> int:
         """
         Remove agents that have been inactive for too long.
@@ -323,24 +465,24 @@ class DatabaseManager:
 
             try:
                 # Get inactive agents
-                cutoff = datetime.utcnow().timestamp() - (max_age_hours * 3600)
+                cutoff = _to_epoch_us(datetime.utcnow() - timedelta(hours=max_age_hours))
 
                 # Delete inactive agents (cascade will handle related records)
-                await self._conn.execute(
+                cursor = await self._conn.execute(
                     """
                     DELETE FROM agents
                     WHERE id IN (
                         SELECT a.id
                         FROM agents a
                         LEFT JOIN agent_states s ON a.id = s.agent_id
-                        WHERE s.last_updated < datetime(?, 'unixepoch')
+                        WHERE s.last_updated < ?
                         OR s.last_updated IS NULL
                     )
                 """,
                     (cutoff,),
                 )
 
-                removed = self._conn.total_changes
+                removed = cursor.rowcount
                 await self._conn.commit()
                 return removed
 
@@ -4,7 +4,7 @@ Provides a unified interface for GPU-accelerated computations and memory managem
 """
 
 import asyncio
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Union
 import torch
 import cupy as cp
 import numpy as np
@@ -40,6 +40,7 @@ class GPUManager:
         self.memory_limit = memory_limit
         self._lock = asyncio.Lock()
         self._memory_pool = None
+        self._nvml_handle = None
         self._initialize_gpu()
     
     def _initialize_gpu(self) -> None:
@@ -65,6 +66,15 @@ class GPUManager:
             self._memory_pool = cp.cuda.MemoryPool()
             cp.cuda.set_allocator(self._memory_pool.malloc)
             
+            # NVML is optional; cache the handle so stats polls skip nvmlInit
+            try:
+                import pynvml
+                pynvml.nvmlInit()
+                self._nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(self.device_id)
+            except Exception as e:
+                logger.debug(f"NVML not available: {str(e)}")
+                self._nvml_handle = None
+            
             logger.info(f"Initialized GPU: {self.device_name}")
             logger.info(f"Total memory: {self.total_memory / 1024**2:.1f} MB")
             
@@ -90,8 +100,9 @@ class GPUManager:
                 # Get utilization (requires nvidia-smi)
                 try:
                     import pynvml
-                    pynvml.nvmlInit()
-                    handle = pynvml.nvmlDeviceGetHandleByIndex(self.device_id)
+                    handle = self._nvml_handle
+                    if handle is None:
+                        raise RuntimeError("NVML not initialized")
                     utilization = pynvml.nvmlDeviceGetUtilizationRates(handle).gpu
                     temperature = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
                     power_usage = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000.0  # Convert to watts
@@ -150,37 +161,85 @@ class GPUManager:
         async with self._lock:
             try:
                 model.eval()
-                results = []
                 
-                # Process in batches
-                for i in range(0, len(inputs), batch_size):
-                    batch = inputs[i:i + batch_size]
+                # Same-shape inputs: stack and pin once, then stage pinned slices
+                if inputs and self._is_uniform_tensor_list(inputs):
+                    inputs = torch.stack(inputs).pin_memory()
+                
+                batches = [
+                    inputs[i:i + batch_size]
+                    for i in range(0, len(inputs), batch_size)
+                ]
+                if not batches:
+                    return []
+                
+                # Copies run on their own stream so they overlap with compute
+                compute_stream = torch.cuda.current_stream()
+                copy_stream = torch.cuda.Stream()
+                host_outputs = []
+                
+                pending = self._stage_batch(batches[0], copy_stream)
+                for idx in range(len(batches)):
+                    batch, ready = pending
                     
-                    # Stack tensors if needed
-                    if isinstance(batch[0], torch.Tensor):
-                        batch = torch.stack(batch)
+                    # Start the H2D copy of the next batch before computing this one
+                    if idx + 1 < len(batches):
+                        pending = self._stage_batch(batches[idx + 1], copy_stream)
                     
-                    # Move to GPU
-                    batch = batch.cuda()
+                    compute_stream.wait_event(ready)
+                    batch.record_stream(compute_stream)
                     
                     # Run inference
                     with torch.no_grad():
                         outputs = model(batch)
                     
-                    # Move back to CPU and add to results
-                    results.extend(outputs.cpu())
+                    # Queue the D2H copy into pinned memory without blocking
+                    done = torch.cuda.Event()
+                    done.record(compute_stream)
+                    with torch.cuda.stream(copy_stream):
+                        copy_stream.wait_event(done)
+                        host = torch.empty(
+                            outputs.shape, dtype=outputs.dtype, pin_memory=True
+                        )
+                        host.copy_(outputs, non_blocking=True)
+                        outputs.record_stream(copy_stream)
+                    host_outputs.append(host)
+                
+                copy_stream.synchronize()
                 
+                results = []
+                for host in host_outputs:
+                    results.extend(host)
                 return results
                 
             except Exception as e:
                 logger.error(f"Failed to perform batch inference: {str(e)}")
                 raise RuntimeError(f"Batch inference failed: {str(e)}")
     
+    def _stage_batch(
+        self,
+        batch: Union[List[torch.Tensor], torch.Tensor],
+        copy_stream: "torch.cuda.Stream"
+    ) -> Tuple[torch.Tensor, "torch.cuda.Event"]:
+        """Pin a host batch and start its async copy to the GPU on copy_stream."""
+        # Stack tensors if needed
+        if isinstance(batch, list) and isinstance(batch[0], torch.Tensor):
+            batch = torch.stack(batch)
+        
+        # The caching host allocator recycles pinned blocks between batches
+        host = batch if batch.is_pinned() else batch.pin_memory()
+        with torch.cuda.stream(copy_stream):
+            device_batch = host.to(f"cuda:{self.device_id}", non_blocking=True)
+            ready = torch.cuda.Event()
+            ready.record(copy_stream)
+        return device_batch, ready
+    
     async def parallel_map(
         self,
         func: callable,
         data: List[Any],
-        num_workers: Optional[int] = None
+        num_workers: Optional[int] = None,
+        capture: bool = False
     ) -> List[Any]:
         """
         Parallel map operation using GPU.
@@ -189,12 +248,21 @@ class GPUManager:
             func: Function to apply
             data: List of data to process
             num_workers: Number of parallel workers
+            capture: Capture ``func`` once into a CUDA graph and replay it per
+                item. Requires same-shape tensor inputs and a capturable func;
+                falls back to per-stream execution otherwise.
             
         Returns:
             List[Any]: Processed results
         """
         async with self._lock:
             try:
+                if capture and data and self._is_uniform_tensor_list(data):
+                    try:
+                        return self._graph_map(func, data)
+                    except Exception as e:
+                        logger.warning(f"CUDA graph capture failed, using streams: {str(e)}")
+                
                 if num_workers is None:
                     num_workers = torch.cuda.device_count()
                 
@@ -217,11 +285,54 @@ class GPUManager:
                 logger.error(f"Failed to perform parallel map: {str(e)}")
                 raise RuntimeError(f"Parallel map failed: {str(e)}")
     
+    @staticmethod
+    def _is_uniform_tensor_list(data: List[Any]) -> bool:
+        """Check that all items are tensors sharing one shape and dtype."""
+        first = data[0]
+        if not isinstance(first, torch.Tensor):
+            return False
+        return all(
+            isinstance(item, torch.Tensor)
+            and item.shape == first.shape
+            and item.dtype == first.dtype
+            for item in data
+        )
+    
+    def _graph_map(self, func: callable, data: List[torch.Tensor]) -> List[Any]:
+        """Capture ``func`` into a CUDA graph and replay it for each item."""
+        static_input = data[0].to(f"cuda:{self.device_id}").clone()
+        
+        # Warm up on a side stream so lazy allocations happen before capture
+        warmup_stream = torch.cuda.Stream()
+        warmup_stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(warmup_stream):
+            # Bail out after one call if the output can't be replayed, since
+            # the stream fallback runs func over every item again
+            if not isinstance(func(static_input), torch.Tensor):
+                raise TypeError("func must return a tensor to be captured")
+            for _ in range(2):
+                func(static_input)
+        torch.cuda.current_stream().wait_stream(warmup_stream)
+        
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph):
+            static_output = func(static_input)
+        
+        results = []
+        for item in data:
+            static_input.copy_(item, non_blocking=True)
+            graph.replay()
+            results.append(static_output.clone())
+        
+        torch.cuda.synchronize()
+        return results
+    
     async def optimize_model(
         self,
         model: torch.nn.Module,
         input_shape: Tuple[int, ...],
-        precision: str = "fp16"
+        precision: str = "fp16",
+        use_compile: bool = True
     ) -> torch.nn.Module:
         """
         Optimize a model for GPU inference.
@@ -229,7 +340,12 @@ class GPUManager:
         Args:
             model: PyTorch model to optimize
             input_shape: Shape of input tensors
-            precision: Precision to use (fp16, fp32, int8)
+            precision: Precision to use (fp16, fp32, int8, int8-gpu,
+                int4-gpu, fp8). The GPU weight-only modes need ``torchao``;
+                fp8 needs ``transformer_engine`` and a Hopper/Ada GPU, and
+                inference must run under ``te.fp8_autocast``.
+            use_compile: Compile with TorchInductor and CUDA graphs; set to
+                False to fall back to ``torch.jit.trace``
             
         Returns:
             torch.nn.Module: Optimized model
@@ -246,15 +362,38 @@ class GPUManager:
                     model = torch.quantization.quantize_dynamic(
                         model, {torch.nn.Linear}, dtype=torch.qint8
                     )
+                elif precision in ("int8-gpu", "int4-gpu"):
+                    from torchao.quantization import (
+                        quantize_, int8_weight_only, int4_weight_only
+                    )
+                    model = model.half()
+                    quantize_(
+                        model,
+                        int8_weight_only() if precision == "int8-gpu" else int4_weight_only()
+                    )
+                elif precision == "fp8":
+                    model = self._swap_linears_for_fp8(model.half())
                 
                 # Enable cuDNN benchmarking
                 torch.backends.cudnn.benchmark = True
                 
                 # Create example input
                 example_input = torch.randn(input_shape).cuda()
-                if precision == "fp16":
+                if precision in ("fp16", "int8-gpu", "int4-gpu", "fp8"):
                     example_input = example_input.half()
                 
+                if use_compile and hasattr(torch, "compile"):
+                    # Inductor fuses kernels; reduce-overhead replays CUDA graphs
+                    compiled_model = torch.compile(
+                        model, mode="reduce-overhead", dynamic=False
+                    )
+                    
+                    # Warm up to trigger compilation before first real call
+                    with torch.no_grad():
+                        compiled_model(example_input)
+                    
+                    return compiled_model
+                
                 # Trace model
                 traced_model = torch.jit.trace(model, example_input)
                 
@@ -264,11 +403,37 @@ class GPUManager:
                 logger.error(f"Failed to optimize model: {str(e)}")
                 raise RuntimeError(f"Model optimization failed: {str(e)}")
     
+    @staticmethod
+    def _swap_linears_for_fp8(module: torch.nn.Module) -> torch.nn.Module:
+        """Replace nn.Linear layers with Transformer Engine FP8-capable linears."""
+        import transformer_engine.pytorch as te
+        
+        for name, child in module.named_children():
+            if isinstance(child, torch.nn.Linear):
+                fp8_linear = te.Linear(
+                    child.in_features,
+                    child.out_features,
+                    bias=child.bias is not None,
+                    params_dtype=child.weight.dtype
+                )
+                with torch.no_grad():
+                    fp8_linear.weight.copy_(child.weight)
+                    if child.bias is not None:
+                        fp8_linear.bias.copy_(child.bias)
+                setattr(module, name, fp8_linear)
+            else:
+                GPUManager._swap_linears_for_fp8(child)
+        return module
+    
     def __del__(self):
         """Cleanup GPU resources."""
         try:
             if self._memory_pool:
                 self._memory_pool.free_all_blocks()
             torch.cuda.empty_cache()
+            if self._nvml_handle is not None:
+                import pynvml
+                pynvml.nvmlShutdown()
+                self._nvml_handle = None
         except:
             pass 
\ No newline at end of file
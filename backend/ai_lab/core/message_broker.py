@@ -1,25 +1,37 @@
 """
 Redis-based message broker for agent communication.
-Implements a robust pub/sub system with message persistence and error handling.
+Implements a robust stream-based messaging system with message persistence and error handling.
 """
 
-import asyncio
-import json
-from typing import AsyncGenerator, Dict, List, Optional, Set
+from typing import AsyncGenerator, List, Optional, Union
 import aioredis
-from datetime import datetime, timedelta
+import orjson
+from datetime import datetime
 
 from ..models.base import AgentMessage, MessageType, SystemConfig
 
+
+def _encode_message(message: AgentMessage) -> bytes:
+    """Serialize a message for the wire using orjson."""
+    return orjson.dumps(message.model_dump(mode="json"))
+
+
+def _decode_message(data: Union[str, bytes]) -> AgentMessage:
+    """Deserialize a message previously produced by ``_encode_message``."""
+    return AgentMessage.model_validate(orjson.loads(data))
+
 class MessageBroker:
     """Redis-based message broker for agent communication."""
     
     def __init__(self, config: SystemConfig):
         self.config = config
         self.redis: Optional[aioredis.Redis] = None
-        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
-        self._message_ttl = timedelta(days=7)  # Messages expire after 7 days
-        
+        self._broadcast_stream = "agent:broadcast"
+        self._stream_maxlen = 100_000  # Approximate cap on entries per stream
+        self._read_count = 100
+        self._read_block_ms = 1000
+        self._delete_batch_size = 500
+    
     async def connect(self) -> None:
         """Connect to Redis and initialize the broker."""
         try:
@@ -39,9 +51,21 @@ class MessageBroker:
             await self.redis.close()
             self.redis = None
     
+    def _stream_for(self, agent_id: Optional[object]) -> str:
+        """Get the stream key for an agent, or the broadcast stream."""
+        return f"agent:{agent_id}" if agent_id else self._broadcast_stream
+    
+    async def _ensure_group(self, stream: str, group: str, start_id: str) -> None:
+        """Create a consumer group on a stream if it does not exist yet."""
+        try:
+            await self.redis.xgroup_create(stream, group, id=start_id, mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+    
     async def publish(self, message: AgentMessage) -> None:
         """
-        Publish a message to the specified channel.
+        Publish a message to the receiver's stream, or the broadcast stream.
         
         Args:
             message: The message to publish
@@ -51,24 +75,16 @@ class MessageBroker:
         
         try:
             # Convert message to JSON
-            message_data = message.model_dump_json()
-            
-            # Publish to specific channel if receiver_id is set
-            if message.receiver_id:
-                channel = f"agent:{message.receiver_id}"
-                await self.redis.publish(channel, message_data)
+            message_data = _encode_message(message)
             
-            # Always publish to broadcast channel
-            await self.redis.publish("broadcast", message_data)
-            
-            # Store message in Redis for persistence
-            message_key = f"message:{message.id}"
-            await self.redis.setex(
-                message_key,
-                self._message_ttl,
-                message_data
+            # Append to the stream; the stream itself is the persisted history
+            await self.redis.xadd(
+                self._stream_for(message.receiver_id),
+                {"d": message_data},
+                maxlen=self._stream_maxlen,
+                approximate=True
             )
-            
+        
         except Exception as e:
             raise RuntimeError(f"Failed to publish message: {str(e)}")
     
@@ -76,57 +92,57 @@ class MessageBroker:
         """
         Subscribe to messages for a specific agent.
         
+        Messages are read through a consumer group named after the agent, so
+        anything published while the agent was offline is delivered when it
+        resubscribes. Each message is acknowledged after it has been yielded;
+        messages yielded but never acknowledged, e.g. because the subscriber
+        stopped, are redelivered first on the next subscribe.
+        
         Args:
             agent_id: The ID of the agent to subscribe for
-            
+        
         Yields:
             AgentMessage: Messages received by the agent
         """
         if not self.redis:
             raise RuntimeError("Message broker not connected")
         
-        # Create subscription queue
-        queue = asyncio.Queue()
-        channel = f"agent:{agent_id}"
+        stream = self._stream_for(agent_id)
+        group = f"agent:{agent_id}"
+        # A stable consumer name keeps unacknowledged entries claimable by
+        # the agent's next subscription
+        consumer = str(agent_id)
         
-        # Add to subscribers
-        if channel not in self._subscribers:
-            self._subscribers[channel] = set()
-        self._subscribers[channel].add(queue)
+        # Direct messages replay from the start; broadcasts only from now on
+        await self._ensure_group(stream, group, "0")
+        await self._ensure_group(self._broadcast_stream, group, "$")
         
-        try:
-            # Subscribe to agent-specific channel
-            pubsub = self.redis.pubsub()
-            await pubsub.subscribe(channel, "broadcast")
+        # "0" reads this consumer's pending entries; ">" reads new ones
+        start_id = "0"
+        while True:
+            response = await self.redis.xreadgroup(
+                group,
+                consumer,
+                {stream: start_id, self._broadcast_stream: start_id},
+                count=self._read_count,
+                block=self._read_block_ms if start_id == ">" else None
+            )
+            
+            if start_id == "0" and not any(entries for _, entries in response or []):
+                start_id = ">"
+                continue
             
-            # Start message processing loop
-            while True:
-                message = await pubsub.get_message(ignore_subscribe_messages=True)
-                if message:
+            for stream_name, entries in response or []:
+                for entry_id, fields in entries:
                     try:
-                        # Parse message data
-                        data = json.loads(message["data"])
-                        agent_message = AgentMessage.model_validate(data)
-                        
-                        # Only yield messages intended for this agent
-                        if (agent_message.receiver_id is None or 
-                            str(agent_message.receiver_id) == agent_id):
-                            yield agent_message
-                            
+                        agent_message = _decode_message(fields["d"])
                     except Exception as e:
                         print(f"Error processing message: {str(e)}")
+                        await self.redis.xack(stream_name, group, entry_id)
                         continue
-                
-                # Small delay to prevent CPU spinning
-                await asyncio.sleep(0.01)
-                
-        finally:
-            # Cleanup
-            self._subscribers[channel].remove(queue)
-            if not self._subscribers[channel]:
-                del self._subscribers[channel]
-            await pubsub.unsubscribe()
-            await pubsub.close()
+                    
+                    yield agent_message
+                    await self.redis.xack(stream_name, group, entry_id)
     
     async def get_message_history(
         self,
@@ -135,13 +151,13 @@ class MessageBroker:
         message_types: Optional[List[MessageType]] = None
     ) -> List[AgentMessage]:
         """
-        Retrieve message history for an agent.
+        Retrieve the most recent messages delivered to an agent.
         
         Args:
             agent_id: The ID of the agent
             limit: Maximum number of messages to retrieve
             message_types: Optional filter for message types
-            
+        
         Returns:
             List[AgentMessage]: List of historical messages
         """
@@ -149,25 +165,22 @@ class MessageBroker:
             raise RuntimeError("Message broker not connected")
         
         try:
-            # Get all message keys
-            message_keys = await self.redis.keys("message:*")
+            entries = await self.redis.xrevrange(
+                self._stream_for(agent_id), "+", "-", count=limit
+            )
             messages = []
             
-            for key in message_keys[:limit]:
-                data = await self.redis.get(key)
-                if data:
-                    message = AgentMessage.model_validate_json(data)
-                    
-                    # Apply filters
-                    if (message.receiver_id and str(message.receiver_id) == agent_id or
-                        message.sender_id and str(message.sender_id) == agent_id):
-                        if not message_types or message.type in message_types:
-                            messages.append(message)
+            for _, fields in entries:
+                message = _decode_message(fields["d"])
+                
+                # Apply filters
+                if not message_types or message.type in message_types:
+                    messages.append(message)
             
             # Sort by timestamp
             messages.sort(key=lambda x: x.timestamp)
             return messages
-            
+        
         except Exception as e:
             raise RuntimeError(f"Failed to retrieve message history: {str(e)}")
     
@@ -182,20 +195,29 @@ class MessageBroker:
             raise RuntimeError("Message broker not connected")
         
         try:
-            if before_date:
-                # Get all message keys
-                message_keys = await self.redis.keys("message:*")
-                for key in message_keys:
-                    data = await self.redis.get(key)
-                    if data:
-                        message = AgentMessage.model_validate_json(data)
-                        if message.timestamp < before_date:
-                            await self.redis.delete(key)
-            else:
-                # Clear all messages
-                message_keys = await self.redis.keys("message:*")
-                if message_keys:
-                    await self.redis.delete(*message_keys)
-                    
+            batch = []
+            async for key in self.redis.scan_iter(
+                match="agent:*", count=self._delete_batch_size, _type="stream"
+            ):
+                batch.append(key)
+                if len(batch) >= self._delete_batch_size:
+                    await self._clear_streams(batch, before_date)
+                    batch.clear()
+            if batch:
+                await self._clear_streams(batch, before_date)
+        
         except Exception as e:
-            raise RuntimeError(f"Failed to clear message history: {str(e)}") 
\ No newline at end of file
+            raise RuntimeError(f"Failed to clear message history: {str(e)}")
+    
+    async def _clear_streams(self, streams: List[str], before_date: Optional[datetime]) -> None:
+        """Delete or trim a batch of streams in one pipeline."""
+        if not before_date:
+            await self.redis.delete(*streams)
+            return
+        
+        # Stream ids start with their millisecond timestamp, so MINID trims by time
+        min_id = f"{int(before_date.timestamp() * 1000)}-0"
+        pipe = self.redis.pipeline(transaction=False)
+        for stream in streams:
+            pipe.execute_command("XTRIM", stream, "MINID", min_id)
+        await pipe.execute()
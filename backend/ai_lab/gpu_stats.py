@@ -0,0 +1,44 @@
+"""
+GPU statistics via NVML.
+Device handles are looked up once per process, so each snapshot is a few
+direct library calls instead of an nvidia-smi subprocess.
+"""
+
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pynvml
+    pynvml.nvmlInit()
+    HANDLES: List[Any] = [
+        pynvml.nvmlDeviceGetHandleByIndex(i)
+        for i in range(pynvml.nvmlDeviceGetCount())
+    ]
+except Exception as e:
+    logger.debug(f"NVML not available: {e}")
+    pynvml = None
+    HANDLES = []
+
+def gpu_snapshot(index: int = 0) -> Optional[Dict[str, float]]:
+    """
+    Read utilization, memory and temperature for one GPU.
+
+    Args:
+        index: Index of the GPU to read
+
+    Returns:
+        Optional[Dict[str, float]]: The GPU stats, or None if there is no such GPU
+    """
+    if index >= len(HANDLES):
+        return None
+
+    handle = HANDLES[index]
+    memory = pynvml.nvmlDeviceGetMemoryInfo(handle)
+    return {
+        "utilization_percent": pynvml.nvmlDeviceGetUtilizationRates(handle).gpu,
+        "memory_used_mb": memory.used / (1024 * 1024),
+        "memory_total_mb": memory.total / (1024 * 1024),
+        "temperature_c": pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
+    }
@@ -0,0 +1,18 @@
+"""
+Identifier helpers shared by the backend apps.
+"""
+
+import os
+import time
+import uuid
+
+def uuid7() -> uuid.UUID:
+    """Generate a time-ordered UUIDv7 (48-bit ms timestamp + 74 random bits)."""
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | (0x7 << 76)  # version 7
+    value = value & ~(0x3 << 62) | (0x2 << 62)  # RFC 4122 variant
+    return uuid.UUID(int=value)
+
+def uuid7str() -> str:
+    """Generate a UUIDv7 as a string, e.g. for session IDs."""
+    return str(uuid7())
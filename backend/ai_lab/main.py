@@ -1,11 +1,13 @@
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, Request, Response, HTTPException
+from .middleware import FastCORS, cors_origins_from_env
+from .responses import ORJSONResponse
 from pydantic import BaseModel
 import logging
 import sys
 from typing import Optional, Dict, Any
 import time
-from .pipeline_graph import create_agent_graph, AgentState
+from .pipeline_graph import get_compiled_graph, process_task_async, AgentState
+from .ids import uuid7str
 
 # Configure logging
 logging.basicConfig(
@@ -15,20 +17,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="AI-Lab Backend")
+app = FastAPI(title="AI-Lab Backend", default_response_class=ORJSONResponse)
 
 # Allow frontend to call backend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(FastCORS, origins=cors_origins_from_env())
 
-# Initialize the agent graph
-graph = create_agent_graph()
-compiled_graph = graph.compile()
+# Share the process-wide compiled agent graph
+compiled_graph = get_compiled_graph()
 
 class ChatRequest(BaseModel):
     message: str
@@ -40,9 +35,13 @@ class ChatResponse(BaseModel):
     error: Optional[str] = None
     thought_process: Optional[str] = None
 
+# Static payloads are encoded once; /health only appends its timestamp
+_ROOT_RESPONSE = Response(b'{"message":"AI-Lab backend is running!","status":"healthy"}', media_type="application/json")
+_HEALTH_PREFIX = b'{"status":"healthy","timestamp":'
+
 @app.get("/")
 def read_root():
-    return {"message": "AI-Lab backend is running!", "status": "healthy"}
+    return _ROOT_RESPONSE
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(chat: ChatRequest):
@@ -54,11 +53,13 @@ async def chat_endpoint(chat: ChatRequest):
             message=chat.message,
             status="pending",
             feedback="",
-            thought_process=""
+            thought_process="",
+            session_id=chat.session_id or uuid7str()
         )
         
-        # Process through the pipeline
-        result = compiled_graph.invoke(state)
+        # Process through the pipeline without blocking the event loop;
+        # identical concurrent requests share one run
+        result = await process_task_async(compiled_graph, state, use_cache=False)
         
         logger.info(f"Sending response: {result['feedback']}")
         return ChatResponse(
@@ -74,4 +75,4 @@ async def chat_endpoint(chat: ChatRequest):
 # Add health check endpoint
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "timestamp": time.time()} 
\ No newline at end of file
+    return Response(_HEALTH_PREFIX + f"{time.time()}}}".encode(), media_type="application/json") 
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""
+Pure ASGI middleware shared by the AI-Lab apps.
+"""
+
+from typing import Iterable, List, Tuple
+import os
+
+_ALLOW_METHODS = b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+
+def cors_origins_from_env(default: str = "*") -> List[str]:
+    """Read allowed origins from the comma-separated CORS_ORIGINS variable."""
+    value = os.getenv("CORS_ORIGINS", default)
+    return [origin.strip() for origin in value.split(",") if origin.strip()]
+
+class FastCORS:
+    """
+    Minimal CORS middleware working directly on ASGI messages.
+    
+    Allowed origins are kept in a frozenset, preflight requests are answered
+    without reaching the app, and CORS headers are appended to the response
+    start message without building Starlette request/response objects.
+    
+    A "*" origin list sends a constant wildcard header without credentials,
+    since browsers reject credentialed responses for a wildcard origin.
+    """
+    
+    def __init__(self, app, origins: Iterable[str] = ("*",), allow_credentials: bool = True, max_age: int = 600):
+        self.app = app
+        origins = list(origins)
+        self.allow_all = "*" in origins
+        self.allowed = frozenset(origin.encode("latin-1") for origin in origins)
+        
+        if self.allow_all:
+            self.simple_headers: List[Tuple[bytes, bytes]] = []
+            self.wildcard_headers = [(b"access-control-allow-origin", b"*")]
+        else:
+            self.simple_headers = [(b"vary", b"Origin")]
+            if allow_credentials:
+                self.simple_headers.append((b"access-control-allow-credentials", b"true"))
+        self.preflight_headers = self.simple_headers + [
+            (b"access-control-allow-methods", _ALLOW_METHODS),
+            (b"access-control-max-age", str(max_age).encode()),
+        ]
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        origin = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+                break
+        if origin is None or not (self.allow_all or origin in self.allowed):
+            return await self.app(scope, receive, send)
+        
+        allow_origin = b"*" if self.allow_all else origin
+        
+        if scope["method"] == "OPTIONS":
+            request_headers = dict(scope["headers"])
+            if b"access-control-request-method" in request_headers:
+                headers = [(b"access-control-allow-origin", allow_origin)] + self.preflight_headers
+                requested = request_headers.get(b"access-control-request-headers")
+                if requested:
+                    headers.append((b"access-control-allow-headers", requested))
+                await send({"type": "http.response.start", "status": 204, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+        
+        cors_headers = self.wildcard_headers if self.allow_all else [(b"access-control-allow-origin", origin)] + self.simple_headers
+        
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + cors_headers
+            await send(message)
+        
+        await self.app(scope, receive, send_with_cors)
@@ -2,8 +2,15 @@
 Mock LLM for testing when Ollama is not available.
 """
 
+import hashlib
 import random
-from typing import List, Dict, Any
+from collections import OrderedDict
+from typing import List, Dict, Any, FrozenSet
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 
 class MockResponse:
@@ -16,7 +23,38 @@ class MockResponse:
 class MockLLM:
     """Mock LLM that provides realistic responses for testing purposes."""
     
+    # Agent detection keywords
+    _WORKER_KWS = ("worker", "task:")
+    _QA_KWS = ("qa", "review", "work to review:")
+    _REFLECTION_KWS = ("reflection", "reflect on:")
+    
+    # Response selection keywords
+    _IMPLEMENT_KWS = ("implement", "code", "develop", "build")
+    _REVIEW_KWS = ("review", "quality", "check", "validate")
+    _PROCESS_KWS = ("process", "improve", "strategy")
+    _ORG_KWS = ("organization", "structure", "chart", "roles", "team")
+    _STRATEGY_KWS = ("strategy", "plan", "direction", "goals")
+    _DELEGATION_KWS = ("implement", "code", "develop", "build", "delegate")
+    
+    _ALL_KWS = frozenset(
+        _WORKER_KWS + _QA_KWS + _REFLECTION_KWS + _IMPLEMENT_KWS + _REVIEW_KWS
+        + _PROCESS_KWS + _ORG_KWS + _STRATEGY_KWS + _DELEGATION_KWS
+    )
+    
+    _RESPONSE_CACHE_SIZE = 512
+    
     def __init__(self):
+        # Selected response text keyed by a digest of the prompt content
+        self._response_cache: "OrderedDict[bytes, str]" = OrderedDict()
+        
+        # One Aho-Corasick automaton finds every keyword in a single pass
+        self._automaton = None
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self._ALL_KWS:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+        
         self.ceo_responses = {
             "organization": """As the CEO of AI-Lab, I'm proud to lead an innovative organization structured for excellence:
 
@@ -155,61 +193,85 @@ OPTIMIZE: Areas for enhancement include refining our feedback mechanisms and est
 
 STRATEGIZE: Continue building on our collaborative foundation while implementing targeted improvements to enhance efficiency and outcomes."""
         }
+        
+        # Flat (agent, intent) -> response table used by _select_response
+        self._dispatch = {
+            (agent, intent): text
+            for agent, responses in (
+                ("ceo", self.ceo_responses),
+                ("worker", self.worker_responses),
+                ("qa", self.qa_responses),
+                ("reflection", self.reflection_responses),
+            )
+            for intent, text in responses.items()
+        }
     
     def invoke(self, messages) -> MockResponse:
         """Mock the invoke method of a real LLM."""
         content = self._extract_content(messages)
+        key = hashlib.blake2b(content.encode(), digest_size=8).digest()
+        
+        response_text = self._response_cache.get(key)
+        if response_text is None:
+            response_text = self._select_response(content)
+            self._response_cache[key] = response_text
+            if len(self._response_cache) > self._RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+        else:
+            self._response_cache.move_to_end(key)
+        
+        return MockResponse(response_text)
+    
+    def _select_response(self, content: str) -> str:
+        """Pick the canned response for the (lowercased) prompt content."""
+        matched = self._match_keywords(content)
         
         # Determine which agent type this is for based on content
-        if "worker" in content or "task:" in content.lower():
-            responses = self.worker_responses
-            if any(word in content for word in ['implement', 'code', 'develop', 'build']):
-                response_text = responses["implementation"]
-            else:
-                response_text = responses["default"]
-                
-        elif "qa" in content or "review" in content.lower() or "work to review:" in content.lower():
-            responses = self.qa_responses
-            if any(word in content for word in ['review', 'quality', 'check', 'validate']):
-                response_text = responses["review"]
-            else:
-                response_text = responses["default"]
-                
-        elif "reflection" in content or "reflect on:" in content.lower():
-            responses = self.reflection_responses
-            if any(word in content for word in ['process', 'improve', 'strategy']):
-                response_text = responses["process"]
-            else:
-                response_text = responses["default"]
-                
+        if not matched.isdisjoint(self._WORKER_KWS):
+            agent = "worker"
+            intent = "implementation" if not matched.isdisjoint(self._IMPLEMENT_KWS) else "default"
+        elif not matched.isdisjoint(self._QA_KWS):
+            agent = "qa"
+            intent = "review" if not matched.isdisjoint(self._REVIEW_KWS) else "default"
+        elif not matched.isdisjoint(self._REFLECTION_KWS):
+            agent = "reflection"
+            intent = "process" if not matched.isdisjoint(self._PROCESS_KWS) else "default"
         else:
             # CEO responses
-            responses = self.ceo_responses
-            if any(word in content for word in ['organization', 'structure', 'chart', 'roles', 'team']):
-                response_text = responses["organization"]
-            elif any(word in content for word in ['strategy', 'plan', 'direction', 'goals']):
-                response_text = responses["strategy"]
-            elif any(word in content for word in ['implement', 'code', 'develop', 'build', 'delegate']):
-                response_text = responses["delegation"]
+            agent = "ceo"
+            if not matched.isdisjoint(self._ORG_KWS):
+                intent = "organization"
+            elif not matched.isdisjoint(self._STRATEGY_KWS):
+                intent = "strategy"
+            elif not matched.isdisjoint(self._DELEGATION_KWS):
+                intent = "delegation"
             else:
-                response_text = responses["default"]
+                intent = "default"
         
-        return MockResponse(response_text)
+        return self._dispatch.get((agent, intent), self._dispatch[(agent, "default")])
+    
+    def _match_keywords(self, content: str) -> FrozenSet[str]:
+        """Return every known keyword that occurs in the (lowercased) content."""
+        if self._automaton is not None:
+            return frozenset(keyword for _, keyword in self._automaton.iter(content))
+        return frozenset(keyword for keyword in self._ALL_KWS if keyword in content)
+    
+    @staticmethod
+    def _piece(msg) -> str:
+        """Get the text of a single message, whatever its format."""
+        if hasattr(msg, 'content'):
+            return msg.content
+        elif isinstance(msg, dict) and 'content' in msg:
+            return msg['content']
+        return str(msg)
     
     def _extract_content(self, messages) -> str:
         """Extract content from various message formats."""
         if isinstance(messages, str):
             return messages.lower()
         elif isinstance(messages, list):
-            content = ""
-            for msg in messages:
-                if hasattr(msg, 'content'):
-                    content += msg.content.lower() + " "
-                elif isinstance(msg, dict) and 'content' in msg:
-                    content += msg['content'].lower() + " "
-                else:
-                    content += str(msg).lower() + " "
-            return content
+            # Join first and lowercase once instead of per fragment
+            return " ".join(self._piece(msg) for msg in messages).lower()
         else:
             return str(messages).lower()
     
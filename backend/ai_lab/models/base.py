@@ -8,7 +8,7 @@ from enum import Enum
 from typing import Dict, List, Optional, Union, Any
 from uuid import UUID, uuid4
 
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field
 
 class AgentRole(str, Enum):
     """Enum defining the possible roles an agent can have."""
@@ -44,8 +44,6 @@ class BaseMessage(BaseModel):
     type: MessageType
     content: str
     metadata: Dict[str, Any] = Field(default_factory=dict)
-    
-    model_config = ConfigDict(arbitrary_types_allowed=True)
 
 class AgentMessage(BaseMessage):
     """Message exchanged between agents."""
@@ -54,8 +52,6 @@ class AgentMessage(BaseMessage):
     conversation_id: UUID
     thought_process: Optional[str] = None
     tool_calls: List[Dict[str, Any]] = Field(default_factory=list)
-    
-    model_config = ConfigDict(arbitrary_types_allowed=True)
 
 class AgentConfig(BaseModel):
     """Configuration for an agent instance."""
@@ -69,8 +65,6 @@ class AgentConfig(BaseModel):
     max_tokens: int = 2000
     memory_size: int = 1000
     tools: List[str] = Field(default_factory=list)
-    
-    model_config = ConfigDict(arbitrary_types_allowed=True)
 
 class AgentMetrics(BaseModel):
     """Metrics for monitoring agent performance."""
@@ -81,8 +75,6 @@ class AgentMetrics(BaseModel):
     gpu_utilization: float = 0.0
     memory_usage: float = 0.0
     last_heartbeat: datetime = Field(default_factory=datetime.utcnow)
-    
-    model_config = ConfigDict(arbitrary_types_allowed=True)
 
 class AgentStatus(BaseModel):
     """Current status of an agent."""
@@ -92,8 +84,6 @@ class AgentStatus(BaseModel):
     current_task: Optional[str] = None
     metrics: AgentMetrics = Field(default_factory=AgentMetrics)
     last_updated: datetime = Field(default_factory=datetime.utcnow)
-    
-    model_config = ConfigDict(arbitrary_types_allowed=True)
 
 class SystemConfig(BaseModel):
     """Global system configuration."""
@@ -106,5 +96,3 @@ class SystemConfig(BaseModel):
     gpu_memory_limit: Optional[int] = None
     enable_monitoring: bool = True
     enable_tracing: bool = True
-    
-    model_config = ConfigDict(arbitrary_types_allowed=True) 
\ No newline at end of file
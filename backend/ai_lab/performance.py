@@ -5,17 +5,44 @@ Tracks LLM inference times, I/O operations, and system metrics.
 
 import time
 import psutil
-import GPUtil
 import asyncio
-from typing import Dict, List, Optional, Any
-from datetime import datetime
-from functools import wraps
+import math
+import os
+import re
+import socket
+import sys
+import numpy as np
+from collections import deque
+from typing import Callable, Dict, List, Optional, Any, Tuple
+from datetime import datetime, timezone
+from functools import partial, wraps
+from operator import attrgetter, itemgetter
 import logging
-from prometheus_client import Counter, Histogram, Gauge, generate_latest
+from prometheus_client import REGISTRY, Counter, Histogram, Gauge, generate_latest
 from .database import db_manager
+from .gpu_stats import gpu_snapshot
 
 logger = logging.getLogger(__name__)
 
+# Characters InfluxDB line protocol needs escaped in measurements and tags
+_LINE_PROTOCOL_SPECIAL = re.compile(r"([,= ])")
+
+def _escape_line_protocol(value: str) -> str:
+    """Backslash-escape commas, equals signs and spaces for line protocol."""
+    return _LINE_PROTOCOL_SPECIAL.sub(r"\\\1", value)
+
+def udp_target_from_env(name: str = "METRICS_UDP_TARGET") -> Optional[Tuple[str, int]]:
+    """Read a "host:port" UDP metrics target from the environment, or None if unset."""
+    value = os.getenv(name, "").strip()
+    if not value:
+        return None
+    host, _, port = value.rpartition(":")
+    try:
+        return host, int(port)
+    except ValueError:
+        logger.warning(f"Ignoring {name}={value!r}; expected host:port")
+        return None
+
 # Prometheus metrics
 REQUEST_COUNT = Counter('ai_lab_requests_total', 'Total requests', ['endpoint'])
 REQUEST_DURATION = Histogram('ai_lab_request_duration_seconds', 'Request duration', ['endpoint'])
@@ -24,133 +51,353 @@ GPU_UTILIZATION = Gauge('ai_lab_gpu_utilization_percent', 'GPU utilization perce
 MEMORY_USAGE = Gauge('ai_lab_memory_usage_bytes', 'Memory usage in bytes')
 CPU_USAGE = Gauge('ai_lab_cpu_usage_percent', 'CPU usage percentage')
 
+# System metric sources, each read once per sample, and the
+# (metric name, field getter, gauge or None) entries derived from each reading
+SAMPLERS: List[Tuple[Callable[[], Any], List[Tuple[str, Optional[Callable], Optional[Gauge]]]]] = [
+    # CPU usage since the previous sample (non-blocking)
+    (lambda: psutil.cpu_percent(interval=None), [
+        ('cpu_usage_percent', None, CPU_USAGE),
+    ]),
+    (psutil.virtual_memory, [
+        ('memory_usage_bytes', attrgetter('used'), MEMORY_USAGE),
+        ('memory_usage_percent', attrgetter('percent'), None),
+    ]),
+    # Primary GPU; None when no GPU is available
+    (gpu_snapshot, [
+        ('gpu_utilization_percent', itemgetter('utilization_percent'), GPU_UTILIZATION),
+        ('gpu_memory_used_mb', itemgetter('memory_used_mb'), None),
+        ('gpu_memory_total_mb', itemgetter('memory_total_mb'), None),
+        ('gpu_temperature_c', itemgetter('temperature_c'), None),
+    ]),
+]
+
 class PerformanceMonitor:
     """Performance monitoring and benchmarking."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        max_buffer_size: int = 1000,
+        flush_interval: float = 1.0,
+        udp_target: Optional[Tuple[str, int]] = None
+    ):
         self.db = db_manager
         self.start_time = time.time()
         
+        # Prime the CPU counter so later non-blocking samples have a baseline
+        psutil.cpu_percent(interval=None)
+        
+        # Ring buffer of pending metric rows, written in bulk by a background task
+        self._buffer: deque = deque(maxlen=max_buffer_size)
+        self._lock = asyncio.Lock()
+        self._max_buffer_size = max_buffer_size
+        self._flush_interval = flush_interval
+        self._flush_task: Optional[asyncio.Task] = None
+        
+        # Latest system metrics sample, refreshed by the background sampler
+        self._snapshot: Dict[str, Any] = {}
+        self._sampler_task: Optional[asyncio.Task] = None
+        
+        # Optional (host, port) that Prometheus samples are pushed to over UDP
+        # in InfluxDB line protocol on every flush (e.g. a Telegraf listener);
+        # the socket is connected by start()
+        self.udp_target = udp_target
+        self._udp_socket: Optional[socket.socket] = None
+        self._udp_max_datagram = 1400
+        
     async def record_metric(self, metric_name: str, metric_value: Any, session_id: Optional[str] = None):
-        """Record a performance metric."""
+        """Buffer a performance metric for the next bulk write."""
+        self._buffer.append({
+            "metric_name": metric_name,
+            "metric_value": str(metric_value),
+            "session_id": session_id,
+            "timestamp": datetime.now(timezone.utc)
+        })
+        
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        if len(self._buffer) >= self._max_buffer_size:
+            await self.flush()
+    
+    async def flush(self):
+        """Write all buffered metrics in a single multi-row insert."""
+        async with self._lock:
+            rows = list(self._buffer)
+            self._buffer.clear()
+        
         try:
-            await self.db.record_metric(metric_name, str(metric_value), session_id)
+            await self.db.record_metrics_bulk(rows)
         except Exception as e:
-            logger.error(f"Error recording metric: {e}")
+            logger.error(f"Error recording {len(rows)} metrics: {e}")
+    
+    async def start(self):
+        """Start the background flush loop, connecting the UDP push socket first if configured."""
+        if self.udp_target and self._udp_socket is None:
+            try:
+                self._udp_socket = await self._connect_udp(*self.udp_target)
+            except OSError as e:
+                logger.warning(f"UDP metrics target {self.udp_target} unavailable: {e}")
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        """Stop the background flush loop, then write whatever is still buffered."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        if self._udp_socket is not None:
+            self._udp_socket.close()
+            self._udp_socket = None
+    
+    @staticmethod
+    async def _connect_udp(host: str, port: int) -> socket.socket:
+        """Resolve host once, off the event loop, and return a UDP socket connected to it."""
+        loop = asyncio.get_running_loop()
+        family, type_, proto, _, address = (
+            await loop.getaddrinfo(host, port, type=socket.SOCK_DGRAM)
+        )[0]
+        sock = socket.socket(family, type_, proto)
+        sock.setblocking(False)
+        sock.connect(address)
+        return sock
+    
+    async def _flush_loop(self):
+        """Background task that flushes the buffer every flush_interval seconds."""
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            await self.flush()
+            if self._udp_socket is not None:
+                try:
+                    self.push_udp()
+                except OSError as e:
+                    logger.debug(f"UDP metrics push failed: {e}")
+    
+    def push_udp(self):
+        """Send every Prometheus sample to the UDP target as InfluxDB line protocol."""
+        timestamp_ns = time.time_ns()
+        batch = bytearray()
+        for family in REGISTRY.collect():
+            for sample in family.samples:
+                # Line protocol has no NaN or Inf, e.g. an empty histogram's +Inf bucket bound
+                if not math.isfinite(sample.value):
+                    continue
+                # Empty tag values are invalid, so those labels are left out
+                tags = "".join(
+                    f",{_escape_line_protocol(key)}={_escape_line_protocol(value)}"
+                    for key, value in sample.labels.items()
+                    if value
+                )
+                line = f"{_escape_line_protocol(sample.name)}{tags} value={sample.value} {timestamp_ns}\n".encode()
+                if batch and len(batch) + len(line) > self._udp_max_datagram:
+                    self._udp_socket.send(batch)
+                    batch = bytearray()
+                batch += line
+        if batch:
+            self._udp_socket.send(batch)
     
     def time_operation(self, operation_name: str):
         """Decorator to time operations."""
+        # Resolve the labelled children once instead of on every call
+        duration_metric = REQUEST_DURATION.labels(endpoint=operation_name)
+        count_metric = REQUEST_COUNT.labels(endpoint=operation_name)
+        duration_key = sys.intern(f"{operation_name}_duration")
+        error_key = sys.intern(f"{operation_name}_error")
+        
         def decorator(func):
-            @wraps(func)
-            async def async_wrapper(*args, **kwargs):
-                start_time = time.time()
-                try:
-                    result = await func(*args, **kwargs)
-                    duration = time.time() - start_time
-                    
-                    # Record to Prometheus
-                    REQUEST_DURATION.labels(endpoint=operation_name).observe(duration)
-                    REQUEST_COUNT.labels(endpoint=operation_name).inc()
-                    
-                    # Record to database
-                    await self.record_metric(f"{operation_name}_duration", duration)
-                    
-                    logger.info(f"{operation_name} completed in {duration:.2f}s")
-                    return result
-                except Exception as e:
-                    duration = time.time() - start_time
-                    await self.record_metric(f"{operation_name}_error", str(e))
-                    logger.error(f"{operation_name} failed after {duration:.2f}s: {e}")
-                    raise
+            # Only build the wrapper that matches the function
+            if asyncio.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    start_ns = time.monotonic_ns()
+                    try:
+                        result = await func(*args, **kwargs)
+                        duration = (time.monotonic_ns() - start_ns) / 1e9
+                        
+                        # Record to Prometheus
+                        duration_metric.observe(duration)
+                        count_metric.inc()
+                        
+                        # Record to database
+                        await self.record_metric(duration_key, duration)
+                        
+                        logger.info(f"{operation_name} completed in {duration:.2f}s")
+                        return result
+                    except Exception as e:
+                        duration = (time.monotonic_ns() - start_ns) / 1e9
+                        await self.record_metric(error_key, str(e))
+                        logger.error(f"{operation_name} failed after {duration:.2f}s: {e}")
+                        raise
+                
+                return async_wrapper
             
             @wraps(func)
             def sync_wrapper(*args, **kwargs):
-                start_time = time.time()
+                start_ns = time.monotonic_ns()
                 try:
                     result = func(*args, **kwargs)
-                    duration = time.time() - start_time
+                    duration = (time.monotonic_ns() - start_ns) / 1e9
                     
                     # Record to Prometheus
-                    REQUEST_DURATION.labels(endpoint=operation_name).observe(duration)
-                    REQUEST_COUNT.labels(endpoint=operation_name).inc()
+                    duration_metric.observe(duration)
+                    count_metric.inc()
                     
                     logger.info(f"{operation_name} completed in {duration:.2f}s")
                     return result
                 except Exception as e:
-                    duration = time.time() - start_time
+                    duration = (time.monotonic_ns() - start_ns) / 1e9
                     logger.error(f"{operation_name} failed after {duration:.2f}s: {e}")
                     raise
             
-            return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
+            return sync_wrapper
         return decorator
     
-    async def collect_system_metrics(self):
-        """Collect current system metrics."""
+    def _sample_system_metrics(self, rows: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Read CPU, memory and GPU metrics synchronously (run in a worker thread).
+        
+        Each value is stored, pushed to its Prometheus gauge and, if `rows` is
+        given, appended as a database row in the same pass.
+        
+        Args:
+            rows: Optional list to append metric rows to for a bulk insert
+            
+        Returns:
+            Dict[str, Any]: The sampled metrics by name
+        """
         metrics = {}
+        timestamp = datetime.now(timezone.utc)
         
-        # CPU usage
-        cpu_percent = psutil.cpu_percent(interval=1)
-        metrics['cpu_usage_percent'] = cpu_percent
-        CPU_USAGE.set(cpu_percent)
+        for read, fields in SAMPLERS:
+            try:
+                reading = read()
+            except Exception as e:
+                logger.debug(f"System metric source not available: {e}")
+                continue
+            if reading is None:
+                continue
+            
+            for name, field, gauge in fields:
+                value = field(reading) if field else reading
+                metrics[name] = value
+                if gauge is not None:
+                    gauge.set(value)
+                if rows is not None:
+                    rows.append({
+                        "metric_name": name,
+                        "metric_value": str(value),
+                        "session_id": None,
+                        "timestamp": timestamp
+                    })
         
-        # Memory usage
-        memory = psutil.virtual_memory()
-        metrics['memory_usage_bytes'] = memory.used
-        metrics['memory_usage_percent'] = memory.percent
-        MEMORY_USAGE.set(memory.used)
+        return metrics
+    
+    def start_sampler(self, interval: float = 2.0, persist_interval: float = 60.0):
+        """
+        Start sampling system metrics in the background every `interval` seconds.
+        
+        Args:
+            interval: Seconds between samples of the in-memory snapshot
+            persist_interval: Minimum seconds between samples also written to the database
+        """
+        if self._sampler_task is None or self._sampler_task.done():
+            self._sampler_task = asyncio.create_task(self._sample_loop(interval, persist_interval))
+    
+    async def stop_sampler(self):
+        """Stop the background system metrics sampler."""
+        if self._sampler_task:
+            self._sampler_task.cancel()
+            try:
+                await self._sampler_task
+            except asyncio.CancelledError:
+                pass
+            self._sampler_task = None
+    
+    async def _sample_loop(self, interval: float, persist_interval: float):
+        """Background task that refreshes the snapshot and periodically stores it."""
+        loop = asyncio.get_running_loop()
+        next_persist = loop.time()
+        while True:
+            try:
+                if loop.time() >= next_persist:
+                    next_persist = loop.time() + persist_interval
+                    self._snapshot = await self.collect_system_metrics()
+                else:
+                    self._snapshot = await loop.run_in_executor(None, self._sample_system_metrics)
+            except Exception as e:
+                logger.error(f"Error sampling system metrics: {e}")
+            await asyncio.sleep(interval)
+    
+    async def get_system_snapshot(self) -> Dict[str, Any]:
+        """Get the latest sampled system metrics, sampling once if none exist yet."""
+        if not self._snapshot:
+            loop = asyncio.get_running_loop()
+            self._snapshot = await loop.run_in_executor(None, self._sample_system_metrics)
+        return self._snapshot.copy()
+    
+    async def collect_system_metrics(self):
+        """Collect current system metrics."""
+        # All psutil/NVML calls happen in one hop to the default executor,
+        # which also fills the gauges and the database rows
+        loop = asyncio.get_running_loop()
+        rows: List[Dict[str, Any]] = []
+        metrics = await loop.run_in_executor(None, partial(self._sample_system_metrics, rows))
         
-        # GPU metrics (if available)
+        # Record all metrics in one multi-row insert
         try:
-            gpus = GPUtil.getGPUs()
-            if gpus:
-                gpu = gpus[0]  # Primary GPU
-                metrics['gpu_utilization_percent'] = gpu.load * 100
-                metrics['gpu_memory_used_mb'] = gpu.memoryUsed
-                metrics['gpu_memory_total_mb'] = gpu.memoryTotal
-                metrics['gpu_temperature_c'] = gpu.temperature
-                
-                GPU_UTILIZATION.set(gpu.load * 100)
+            await self.db.record_metrics_bulk(rows)
         except Exception as e:
-            logger.debug(f"GPU metrics not available: {e}")
-        
-        # Record all metrics
-        for metric_name, value in metrics.items():
-            await self.record_metric(metric_name, value)
+            logger.error(f"Error recording system metrics: {e}")
         
         return metrics
     
-    async def benchmark_llm_inference(self, model_name: str, prompt: str, iterations: int = 5) -> Dict:
-        """Benchmark LLM inference performance."""
+    async def benchmark_llm_inference(
+        self,
+        model_name: str,
+        prompt: str,
+        iterations: int = 5,
+        concurrency: int = 4
+    ) -> Dict:
+        """Benchmark LLM inference performance, running up to `concurrency` samples at once."""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def timed_inference() -> int:
+            async with semaphore:
+                start_ns = time.monotonic_ns()
+                
+                # This would call your actual LLM inference
+                # For now, we'll simulate it
+                await asyncio.sleep(0.1)  # Simulate inference time
+                
+                duration_ns = time.monotonic_ns() - start_ns
+            
+            # Record individual inference time
+            LLM_INFERENCE_TIME.observe(duration_ns / 1e9)
+            await self.record_metric('llm_inference_time', duration_ns / 1e9)
+            return duration_ns
+        
+        # Durations are kept as integer nanoseconds and converted once at the end
+        times_ns = await asyncio.gather(*(timed_inference() for _ in range(iterations)))
+        
+        # One vectorized reduction over all samples, in seconds
+        times = np.asarray(times_ns, dtype=np.float64) / 1e9
         results = {
             'model_name': model_name,
             'prompt_length': len(prompt),
             'iterations': iterations,
-            'times': [],
-            'avg_time': 0,
-            'min_time': float('inf'),
-            'max_time': 0,
-            'total_time': 0
+            'concurrency': concurrency,
+            'times': times.tolist(),
+            'avg_time': float(times.mean()) if times.size else 0,
+            'min_time': float(times.min()) if times.size else float('inf'),
+            'max_time': float(times.max()) if times.size else 0,
+            'total_time': float(times.sum()),
+            'p50_time': float(np.median(times)) if times.size else 0,
+            'p95_time': float(np.percentile(times, 95)) if times.size else 0
         }
         
-        for i in range(iterations):
-            start_time = time.time()
-            
-            # This would call your actual LLM inference
-            # For now, we'll simulate it
-            await asyncio.sleep(0.1)  # Simulate inference time
-            
-            duration = time.time() - start_time
-            results['times'].append(duration)
-            results['total_time'] += duration
-            results['min_time'] = min(results['min_time'], duration)
-            results['max_time'] = max(results['max_time'], duration)
-            
-            # Record individual inference time
-            LLM_INFERENCE_TIME.observe(duration)
-            await self.record_metric('llm_inference_time', duration)
-        
-        results['avg_time'] = results['total_time'] / iterations
-        
         # Record benchmark results
         await self.record_metric('llm_benchmark_avg_time', results['avg_time'])
         await self.record_metric('llm_benchmark_min_time', results['min_time'])
@@ -162,7 +409,7 @@ class PerformanceMonitor:
         """Get performance summary for the last N hours."""
         # This would query the database for metrics
         # For now, return current system state
-        system_metrics = await self.collect_system_metrics()
+        system_metrics = await self.get_system_snapshot()
         
         summary = {
             'uptime_seconds': time.time() - self.start_time,
@@ -172,12 +419,12 @@ class PerformanceMonitor:
         
         return summary
     
-    def get_prometheus_metrics(self) -> str:
-        """Get Prometheus-formatted metrics."""
-        return generate_latest().decode('utf-8')
+    def get_prometheus_metrics(self) -> bytes:
+        """Get Prometheus-formatted metrics as the raw exposition bytes."""
+        return generate_latest(REGISTRY)
 
 # Global performance monitor instance
-performance_monitor = PerformanceMonitor()
+performance_monitor = PerformanceMonitor(udp_target=udp_target_from_env())
 
 # Decorator for easy use
 def monitor_performance(operation_name: str):
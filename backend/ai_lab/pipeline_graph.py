@@ -4,18 +4,31 @@ This module provides a robust, type-safe implementation of the agent workflow gr
 dynamic routing, reflection, and error handling.
 """
 
-from typing import Dict, Any, TypedDict, Annotated, Optional, List, Callable
+from typing import Dict, Any, TypedDict, Annotated, Optional, List, Callable, Iterable, Set, AsyncIterator, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from langgraph.graph import StateGraph
-from langchain_openai import ChatOpenAI
 from .agents import CEOAgent, QAAgent, WorkerAgent, ReflectionAgent, AGENT_REGISTRY
 from .conversation import ConversationManager
+from .response_cache import DiskResponseCache, response_cache
+from .thin_llm import ThinChat
+from .ids import uuid7str
+import asyncio
 import logging
+import os
+import re
+import sys
 import time
 from rich.console import Console
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,6 +36,129 @@ logger = logging.getLogger(__name__)
 # Initialize Rich console
 console = Console()
 
+# CEO feedback phrases that end the workflow or ask for reflection
+COMPLETION_PHRASES = [
+    "final answer", "here is my answer", "task is complete",
+    "this concludes", "approved", "the outcome is", "the result is",
+    "the plan is complete", "proceed with implementation",
+    "i have completed", "i have finished", "this is my final",
+    "the answer is", "in summary", "to summarize", "in conclusion"
+]
+REFLECTION_PHRASES = [
+    "reflect", "reflection", "let's review", "let me review",
+    "self-reflect", "self reflection", "let's think", "let's consider"
+]
+# CEO and Reflection turns allowed per task before the router forces END
+MAX_HOPS = 6
+# Pipelines a single run_batch call runs at once
+BATCH_CONCURRENCY = 4
+
+# Greedy prefix, so a match ends right after the last "DECIDE:"
+_DECIDE_RE = re.compile(r".*decide:", re.IGNORECASE | re.DOTALL)
+
+# One-word decisions routed by exact lookup before any phrase matching
+DECISION_MAP = {
+    "worker": "Worker",
+    "qa": "Qa",
+    "reflection": "Reflection",
+    "reflect": "Reflection",
+    "review": "Reflection",
+    "end": "END",
+    "complete": "END",
+    "final": "END",
+    "done": "END"
+}
+
+class PhraseMatcher:
+    """
+    Find which tags have a phrase occurring in a text, in a single pass.
+    
+    Phrases are compiled once into a pyahocorasick automaton when it is
+    installed. Otherwise one regex tries the phrases at every position,
+    longest first, so a phrase that is a prefix of a longer match at the same
+    position is not reported separately.
+    """
+    
+    def __init__(self, tagged_phrases: Dict[str, Iterable[str]]):
+        phrase_tags: Dict[str, Set[str]] = {}
+        for tag, phrases in tagged_phrases.items():
+            for phrase in phrases:
+                phrase_tags.setdefault(phrase.lower(), set()).add(tag)
+        self._tags = {phrase: frozenset(tags) for phrase, tags in phrase_tags.items()}
+        
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for phrase, tags in self._tags.items():
+                self._automaton.add_word(phrase, tags)
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            alternation = "|".join(map(re.escape, sorted(self._tags, key=len, reverse=True)))
+            # ASCII folding keeps every match equal to its phrase once lowercased
+            self._regex = re.compile(f"(?=({alternation}))", re.IGNORECASE | re.ASCII)
+    
+    def tags(self, text: str) -> Set[str]:
+        """Return the tags of every phrase found in the text, ignoring case."""
+        if self._automaton is not None:
+            return set().union(*(tags for _, tags in self._automaton.iter(text.lower())))
+        return set().union(*(self._tags[match.lower()] for match in self._regex.findall(text)))
+
+class PlanTemplateCache:
+    """
+    Remembers the CEO's opening delegation for each coarse task bucket.
+    
+    The CEO picks its first hand-off from the request's keywords alone, so once
+    a bucket has been routed, later requests in it can skip that LLM call. Only
+    delegations are cached: when the CEO ends the task itself, its reply is
+    the answer and has to be generated.
+    """
+    
+    # Same keywords and priority as CEOAgent's delegation checks
+    _BUCKETS = (
+        ("implement", ('implement', 'code', 'develop', 'build', 'create', 'write code')),
+        ("review", ('review', 'check', 'test', 'validate', 'quality')),
+        ("strategy", ('improve', 'optimize', 'strategy', 'plan', 'think about')),
+    )
+    
+    def __init__(self):
+        self._plans: Dict[str, Dict[str, str]] = {}
+    
+    def bucket(self, message: str) -> Optional[str]:
+        """Classify a request into a bucket, or None if it matches none."""
+        message = message.lower()
+        for name, keywords in self._BUCKETS:
+            if any(keyword in message for keyword in keywords):
+                return name
+        return None
+    
+    def get(self, bucket: str) -> Optional[Dict[str, str]]:
+        return self._plans.get(bucket)
+    
+    def set(self, bucket: str, plan: Dict[str, str]):
+        self._plans[bucket] = plan
+    
+    def invalidate(self, bucket: str):
+        self._plans.pop(bucket, None)
+
+@lru_cache(maxsize=4)
+def _get_llm(model_name: str, temperature: float):
+    """Connect to Ollama, falling back to the mock LLM if it is not available."""
+    try:
+        llm = ThinChat(
+            model=model_name,
+            base_url="http://localhost:11434/v1",
+            temperature=temperature
+        )
+        # Test the connection
+        llm.invoke("test")
+        logger.info("Successfully connected to Ollama")
+        return llm
+    except Exception as ollama_error:
+        logger.warning(f"Ollama not available: {ollama_error}. Using mock LLM for testing.")
+        # Create a simple mock LLM for testing
+        from .mock_llm import MockLLM
+        return MockLLM()
+
 @dataclass
 class AgentState:
     """Type-safe state container for agent communication."""
@@ -32,6 +168,7 @@ class AgentState:
     thought_process: str  # Track the agent's reasoning
     session_id: str  # Track the conversation session
     transitions: List[str] = None  # Track state transitions for debugging
+    hops: int = 0  # CEO and Reflection turns taken so far
 
     def __post_init__(self):
         if self.transitions is None:
@@ -41,6 +178,17 @@ class AgentState:
         """Dictionary-like get method for backward compatibility."""
         return getattr(self, key, default)
     
+    def __getitem__(self, key: str) -> Any:
+        """Dictionary-like item access, so agents can read the state directly."""
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+    
+    def keys(self) -> List[str]:
+        """Field names, which together with __getitem__ lets dict(state) work."""
+        return ["message", "status", "feedback", "thought_process", "session_id", "transitions", "hops"]
+    
     def update(self, updates: Dict[str, Any]) -> None:
         """Dictionary-like update method."""
         for key, value in updates.items():
@@ -55,7 +203,8 @@ class AgentState:
             "feedback": self.feedback,
             "thought_process": self.thought_process,
             "session_id": self.session_id,
-            "transitions": self.transitions or []
+            "transitions": self.transitions or [],
+            "hops": self.hops
         }
     
     @classmethod
@@ -67,7 +216,8 @@ class AgentState:
             feedback=data.get("feedback", ""),
             thought_process=data.get("thought_process", ""),
             session_id=data.get("session_id", ""),
-            transitions=data.get("transitions", [])
+            transitions=data.get("transitions", []),
+            hops=data.get("hops", 0)
         )
 
 class PipelineGraph:
@@ -77,39 +227,37 @@ class PipelineGraph:
         self,
         conversation_manager: Optional[ConversationManager] = None,
         model_name: str = "mistral",
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        fast_model_name: Optional[str] = None
     ):
         self.conversation_manager = conversation_manager
         self.model_name = model_name
+        # QA and Reflection are high-volume and low-stakes, so they can run on a
+        # quantized variant (e.g. mistral:7b-instruct-q4_K_M) while the CEO and
+        # Worker keep the full-precision model
+        self.fast_model_name = fast_model_name or os.getenv("OLLAMA_FAST_MODEL") or model_name
         self.temperature = temperature
+        # Only draw the progress spinner when someone is watching the terminal
+        self.interactive = console.is_terminal
         self.graph = None
+        self._compiled_graph = None
+        self.plan_cache = PlanTemplateCache()
+        # Runs the QA half of each review while Reflection runs on the calling thread
+        self._review_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="qa-review")
         self._initialize_graph()
 
     def _initialize_graph(self) -> None:
         """Initialize the agent workflow graph with error handling."""
         try:
-            # Try to initialize the language model with Ollama, fallback to mock if not available
-            try:
-                llm = ChatOpenAI(
-                    model=self.model_name,
-                    api_key="not-needed",
-                    base_url="http://localhost:11434/v1",
-                    temperature=self.temperature
-                )
-                # Test the connection
-                test_response = llm.invoke("test")
-                logger.info("Successfully connected to Ollama")
-            except Exception as ollama_error:
-                logger.warning(f"Ollama not available: {ollama_error}. Using mock LLM for testing.")
-                # Create a simple mock LLM for testing
-                from .mock_llm import MockLLM
-                llm = MockLLM()
+            # Ollama is probed once per model; later graphs reuse the result
+            llm = _get_llm(self.model_name, self.temperature)
+            fast_llm = _get_llm(self.fast_model_name, self.temperature)
             
             # Initialize agents with the language model and conversation manager
             self.ceo = CEOAgent(llm=llm, agent_registry=AGENT_REGISTRY, conversation_manager=self.conversation_manager)
             self.worker = WorkerAgent(llm=llm, conversation_manager=self.conversation_manager)
-            self.qa = QAAgent(llm=llm, conversation_manager=self.conversation_manager)
-            self.reflection = ReflectionAgent(llm=llm, conversation_manager=self.conversation_manager)
+            self.qa = QAAgent(llm=fast_llm, conversation_manager=self.conversation_manager)
+            self.reflection = ReflectionAgent(llm=fast_llm, conversation_manager=self.conversation_manager)
             
             # Create agent map for routing
             self.agent_map = {
@@ -117,14 +265,26 @@ class PipelineGraph:
                 "qa": self.qa.run,
                 "reflection": self.reflection.run
             }
+            # Agent tag -> (priority, node name); lower priority wins when several match
+            self._route_nodes = {agent: (i, agent.capitalize()) for i, agent in enumerate(self.agent_map)}
+            
+            # Completion phrases, agent names and reflection phrases share one matcher
+            self._route_matcher = PhraseMatcher({
+                "END": COMPLETION_PHRASES,
+                "Reflection": REFLECTION_PHRASES,
+                **{agent: [agent] for agent in self.agent_map}
+            })
             
             # Create the graph
             self.graph = StateGraph(AgentState)
             
             # Add nodes with wrapper functions to handle state conversion
-            self.graph.add_node("CEO", self._wrap_agent_function(self.ceo.run))
+            # CEO and Reflection turns count toward MAX_HOPS
+            self.graph.add_node("CEO", self._wrap_agent_function(self._plan_ceo, counts_hop=True))
             for name, fn in self.agent_map.items():
-                self.graph.add_node(name.capitalize(), self._wrap_agent_function(fn))
+                self.graph.add_node(name.capitalize(), self._wrap_agent_function(fn, counts_hop=name == "reflection"))
+            # QA and Reflection review the Worker's output side by side
+            self.graph.add_node("Review", self._wrap_agent_function(self._review, counts_hop=True))
             self.graph.add_node("END", lambda state: state)
             
             # Set entry point
@@ -138,28 +298,73 @@ class PipelineGraph:
             )
             
             # Add edges for agent workflow
-            for agent in self.agent_map:
-                self.graph.add_edge(agent.capitalize(), "Reflection")
+            self.graph.add_edge("Worker", "Review")
+            self.graph.add_edge("Qa", "Reflection")
+            self.graph.add_edge("Review", "CEO")
             self.graph.add_edge("Reflection", "CEO")
             
+            # Compile once here; run() and callers share the compiled graph
+            self._compiled_graph = self.graph.compile()
+            
         except Exception as e:
             logger.error(f"Error initializing pipeline graph: {str(e)}")
             raise
 
-    def _wrap_agent_function(self, agent_func: Callable) -> Callable:
-        """Wrap agent functions to handle state conversion between AgentState and dict."""
-        def wrapper(state: AgentState) -> AgentState:
+    def _plan_ceo(self, state: AgentState) -> Dict[str, Any]:
+        """Run the CEO, reusing the cached opening delegation for known task buckets."""
+        # Only the opening turn is templated; later turns review real output
+        if state.status != "pending":
+            return self.ceo.run(state)
+        
+        bucket = self.plan_cache.bucket(state.message)
+        plan = self.plan_cache.get(bucket) if bucket else None
+        if plan:
+            result = dict(state)
+            result.update(plan)
+            return result
+        
+        result = self.ceo.run(state)
+        if bucket:
+            if result.get("status") == "error":
+                self.plan_cache.invalidate(bucket)
+            elif result.get("status", "").startswith("needs_"):
+                self.plan_cache.set(bucket, {
+                    "status": result["status"],
+                    "thought_process": result["thought_process"]
+                })
+        return result
+
+    def _review(self, state: AgentState) -> Dict[str, Any]:
+        """
+        Run QA and Reflection on the Worker's output concurrently and merge them.
+        
+        Both agents read the same state and return fresh dicts, so neither sees
+        the other's update. The merge keeps Reflection's update, appends both
+        reviews' feedback and reasoning, and fails the step if either failed.
+        """
+        qa_future = self._review_pool.submit(self.qa.run, state)
+        reflection_result = self.reflection.run(state)
+        qa_result = qa_future.result()
+        
+        merged = dict(reflection_result)
+        for key in ("feedback", "thought_process"):
+            merged[key] = "\n\n".join(filter(None, (qa_result.get(key), reflection_result.get(key))))
+        if qa_result.get("status") == "error":
+            merged["status"] = "error"
+        return merged
+
+    def _wrap_agent_function(self, agent_func: Callable, counts_hop: bool = False) -> Callable:
+        """Wrap agent functions so errors become an error state instead of raising."""
+        hop = 1 if counts_hop else 0
+        
+        def wrapper(state: AgentState) -> Dict[str, Any]:
             try:
-                # Convert AgentState to dict for the agent
-                state_dict = state.to_dict()
-                
-                # Call the agent function
-                result_dict = agent_func(state_dict)
-                
-                # Convert result back to AgentState
-                result_state = AgentState.from_dict(result_dict)
-                
-                return result_state
+                # Agents read the state through its mapping interface and return
+                # a dict, which LangGraph applies as the node's update directly
+                update = agent_func(state)
+                if hop:
+                    update["hops"] = state.hops + hop
+                return update
                 
             except Exception as e:
                 logger.error(f"Error in agent wrapper: {str(e)}")
@@ -170,7 +375,8 @@ class PipelineGraph:
                     feedback=f"Agent encountered an error: {str(e)}",
                     thought_process="Error occurred during agent processing",
                     session_id=state.session_id,
-                    transitions=state.transitions or []
+                    transitions=state.transitions or [],
+                    hops=state.hops + hop
                 )
                 return error_state
         
@@ -181,61 +387,73 @@ class PipelineGraph:
         Enhanced natural language intent detection for CEO routing.
         Uses both thought process and feedback for robust decision making.
         """
-        thought = state.thought_process.lower()
-        feedback = state.feedback.lower()
+        thought = state.thought_process
+        feedback = state.feedback
+        
+        # Stop a CEO that never emits a recognised decision from looping forever
+        if state.hops >= MAX_HOPS:
+            logger.warning(f"Ending task after {state.hops} CEO/Reflection turns without a decision")
+            return "END"
         
         # Extract decision from thought process
-        if "decide:" in thought:
-            decision = thought.split("decide:")[-1].strip()
-            decision = decision.split("\n")[0].strip()  # Get first line after DECIDE:
+        decide = _DECIDE_RE.match(thought)
+        if decide:
+            decision = thought[decide.end():].strip()
+            decision = decision.split("\n", 1)[0].strip().lower()  # Get first line after DECIDE:
+            
+            # Fast path: the CEO usually decides with a single known word
+            node = DECISION_MAP.get(decision.rstrip(".,;:!?"))
+            if node:
+                return node
             
             # Check for END decision
             if "end" in decision:
                 return "END"
             
             # Check for specific agent decisions
-            for agent in self.agent_map:
-                if agent in decision:
-                    return agent.capitalize()
+            node = self._agent_node_in(self._route_matcher.tags(decision))
+            if node:
+                return node
             
             # If no clear decision, default to reflection
             return "Reflection"
         
-        # Fallback to feedback analysis
-        completion_phrases = [
-            "final answer", "here is my answer", "task is complete",
-            "this concludes", "approved", "the outcome is", "the result is",
-            "the plan is complete", "proceed with implementation",
-            "i have completed", "i have finished", "this is my final",
-            "the answer is", "in summary", "to summarize", "in conclusion"
-        ]
-        
-        if any(phrase in feedback for phrase in completion_phrases):
+        # Fallback to feedback analysis; one scan finds every phrase and agent
+        hits = self._route_matcher.tags(feedback)
+        if "END" in hits:
             return "END"
         
         # Route to agent if CEO mentions them
-        for agent in self.agent_map:
-            if agent in feedback:
-                return agent.capitalize()
+        node = self._agent_node_in(hits)
+        if node:
+            return node
         
         # Route to reflection if CEO asks to reflect or review
-        reflection_phrases = [
-            "reflect", "reflection", "let's review", "let me review",
-            "self-reflect", "self reflection", "let's think", "let's consider"
-        ]
-        
-        if any(phrase in feedback for phrase in reflection_phrases):
+        if "Reflection" in hits:
             return "Reflection"
         
         # Default: reflect for continuous improvement
         return "Reflection"
 
-    def run(self, initial_state: AgentState) -> AgentState:
+    def _agent_node_in(self, hits: Set[str]) -> Optional[str]:
+        """Return the node of the first agent (in agent_map order) among the matched tags."""
+        matched = [self._route_nodes[tag] for tag in hits if tag in self._route_nodes]
+        return min(matched)[1] if matched else None
+
+    def compile(self):
+        """Return the shared graph compiled during initialization."""
+        return self._compiled_graph
+
+    async def run(self, initial_state: AgentState) -> AgentState:
         """
         Execute the agent workflow with the given initial state.
-        Includes progress tracking and error handling.
+        Includes progress tracking and error handling. The graph runs in a
+        worker thread so blocking agent calls don't stall the event loop.
         """
         try:
+            if not self.interactive:
+                return await asyncio.to_thread(self._compiled_graph.invoke, initial_state)
+            
             with Progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
@@ -243,9 +461,8 @@ class PipelineGraph:
             ) as progress:
                 task = progress.add_task("Running agent workflow...", total=None)
                 
-                # Compile and run the graph
-                compiled_graph = self.graph.compile()
-                result = compiled_graph.invoke(initial_state)
+                # Run the shared compiled graph
+                result = await asyncio.to_thread(self._compiled_graph.invoke, initial_state)
                 
                 progress.update(task, completed=True)
                 return result
@@ -254,6 +471,30 @@ class PipelineGraph:
             logger.error(f"Error executing agent workflow: {str(e)}")
             raise
 
+    async def run_batch(self, initial_states: List[Any], max_concurrency: int = BATCH_CONCURRENCY) -> List[Any]:
+        """
+        Execute the agent workflow for several initial states at once.
+
+        Uses LangGraph's native batch support, so independent states run
+        concurrently in one call, at most max_concurrency at a time. A failing
+        state yields its exception in place of a result instead of failing the
+        whole batch.
+
+        Args:
+            initial_states: Initial states, one per message
+            max_concurrency: Most states run at the same time
+
+        Returns:
+            List[Any]: Final states or exceptions, in input order
+        """
+        if not initial_states:
+            return []
+        return await self._compiled_graph.abatch(
+            initial_states,
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        )
+
 def create_agent_graph(conversation_manager: Optional[ConversationManager] = None) -> PipelineGraph:
     """
     Factory function to create and initialize the agent pipeline graph.
@@ -266,6 +507,29 @@ def create_agent_graph(conversation_manager: Optional[ConversationManager] = Non
     """
     return PipelineGraph(conversation_manager=conversation_manager)
 
+# Process-wide graph shared by the CLI and the API apps
+_PIPELINE_GRAPH: Optional[PipelineGraph] = None
+
+def get_pipeline_graph(conversation_manager: Optional[ConversationManager] = None) -> PipelineGraph:
+    """
+    Return the shared pipeline graph, building it on first use.
+    
+    Args:
+        conversation_manager: Conversation manager for the graph; only used by
+            the call that builds it
+        
+    Returns:
+        PipelineGraph: The process-wide pipeline graph
+    """
+    global _PIPELINE_GRAPH
+    if _PIPELINE_GRAPH is None:
+        _PIPELINE_GRAPH = create_agent_graph(conversation_manager=conversation_manager)
+    return _PIPELINE_GRAPH
+
+def get_compiled_graph():
+    """Return the compiled form of the shared pipeline graph."""
+    return get_pipeline_graph().compile()
+
 def print_mermaid():
     """Print the workflow diagram using Mermaid syntax."""
     console.print(Panel.fit('''
@@ -279,9 +543,83 @@ flowchart TD
     Reflection --> CEO_START
 ''', title="Agent Pipeline Workflow"))
 
+# Pipeline runs in progress, keyed by session and normalized message, so
+# concurrent identical requests wait for one run instead of each starting their own
+_INFLIGHT: Dict[Tuple[Optional[str], str], asyncio.Task] = {}
+
+def _forget_inflight(key: Tuple[Optional[str], str], task: asyncio.Task) -> None:
+    """Drop a finished run from the in-flight map."""
+    if _INFLIGHT.get(key) is task:
+        del _INFLIGHT[key]
+    # Mark the error retrieved even if every waiter was cancelled
+    if not task.cancelled():
+        task.exception()
+
+async def process_task_async(graph, state, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Process a single task through the agent pipeline, sharing one run between
+    concurrent identical tasks.
+    
+    The run is a detached task that every caller awaits through a shield, so a
+    cancelled caller stops waiting without cancelling it for the others.
+    
+    Args:
+        graph: The compiled agent graph
+        state: Initial state for the task
+        use_cache: Serve and store answers in the response cache; the API
+            turns this off since its answers depend on the session history
+        
+    Returns:
+        Dict[str, Any]: The final pipeline state
+    """
+    if use_cache:
+        cached = response_cache.get(state["message"])
+        if cached is not None:
+            return cached
+    
+    key = (state.get("session_id"), response_cache.key(state["message"]))
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(graph.ainvoke(state))
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda done: _forget_inflight(key, done))
+    
+    result = await asyncio.shield(task)
+    
+    # Only successful runs are worth replaying
+    if use_cache and result.get("status") == "done":
+        response_cache.set(state["message"], result)
+    # Each caller gets its own copy of the shared result
+    return dict(result)
+
 def process_task(graph, state: AgentState) -> Dict[str, Any]:
-    """Process a single task through the agent pipeline."""
+    """Synchronous wrapper around the CLI's task runner."""
+    return asyncio.run(_run_task(graph, state))
+
+async def process_task_stream(graph, state) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Run a task and yield each node's state update as soon as the node finishes.
+    
+    Args:
+        graph: The compiled agent graph
+        state: Initial state for the task
+        
+    Yields:
+        Tuple[str, Dict[str, Any]]: The node name and the update it produced
+    """
+    async for chunk in graph.astream(state, stream_mode="updates"):
+        for node, update in chunk.items():
+            if update is None:
+                continue
+            # Error states come back as AgentState rather than a dict
+            yield node, update if isinstance(update, dict) else update.to_dict()
+
+async def _run_task(graph, state: AgentState) -> Dict[str, Any]:
+    """Run a single CLI task, showing a spinner and turning errors into an error result."""
     try:
+        if not console.is_terminal:
+            return await process_task_async(graph, state)
+        
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -290,7 +628,7 @@ def process_task(graph, state: AgentState) -> Dict[str, Any]:
             task = progress.add_task("Processing task...", total=None)
             
             # Execute the graph
-            result = graph.invoke(state)
+            result = await process_task_async(graph, state)
             
             progress.update(task, completed=True)
             return result
@@ -303,52 +641,79 @@ def process_task(graph, state: AgentState) -> Dict[str, Any]:
             "thought_process": "Error occurred during processing"
         }
 
+def _print_result_panel(result: Dict[str, Any]):
+    """Show a task result as a Rich panel."""
+    console.print("\n[bold]Results:[/bold]")
+    console.print(Panel(
+        f"[bold]Status:[/bold] {result['status']}\n\n[bold]Thought Process:[/bold]\n{result.get('thought_process', 'No thought process recorded')}\n\n[bold]Feedback:[/bold]\n{result['feedback']}",
+        title="Task Results",
+        border_style="green" if result['status'] == "done" else "red"
+    ))
+    console.print()  # Add spacing
+
+def _print_result_plain(result: Dict[str, Any]):
+    """Show a task result as plain text, without Rich rendering."""
+    print(f"Status: {result['status']}\n\nThought Process:\n{result.get('thought_process', 'No thought process recorded')}\n\nFeedback:\n{result['feedback']}\n", flush=True)
+
 def main():
     """Main function to run the agent graph."""
+    # Plain print output for scripted runs: --quiet or AI_LAB_QUIET=1
+    quiet = bool(os.getenv("AI_LAB_QUIET")) or "--quiet" in sys.argv
+    emit = _print_result_plain if quiet else _print_result_panel
+    
     try:
-        console.print("\n[bold blue]=== AI-Lab Agent Pipeline ===[/bold blue]\n")
+        if not quiet:
+            console.print("\n[bold blue]=== AI-Lab Agent Pipeline ===[/bold blue]\n")
         
-        # Create and compile the graph
-        graph = create_agent_graph()
-        compiled_graph = graph.compile()
+        # Reuse the shared compiled graph
+        compiled_graph = get_compiled_graph()
+        session_id = uuid7str()
         
-        # Print workflow diagram
-        print_mermaid()
+        # Answers from earlier CLI sessions, kept on disk for a day
+        disk_cache = DiskResponseCache(os.getenv("AI_LAB_CACHE_DB", "~/.ai_lab_cache.db"))
         
-        console.print("\n[bold green]Enter a question (or 'quit' to exit):[/bold green]")
+        if not quiet:
+            # Print workflow diagram
+            print_mermaid()
+            console.print("\n[bold green]Enter a question (or 'quit' to exit):[/bold green]")
         
         while True:
-            question = console.input("[bold yellow]>[/bold yellow] ").strip()
+            question = (input("> ") if quiet else console.input("[bold yellow]>[/bold yellow] ")).strip()
             
             if question.lower() == "quit":
                 break
-                
-            console.print("\n[bold]Processing...[/bold]")
+            
+            if not quiet:
+                console.print("\n[bold]Processing...[/bold]")
             
             # Initialize state with thought process tracking
             state = AgentState(
                 message=question,
                 status="pending",
                 feedback="",
-                thought_process=""
+                thought_process="",
+                session_id=session_id
             )
             
-            # Process the task
-            result = process_task(compiled_graph, state)
+            # Process the task unless an earlier session already answered it
+            result = disk_cache.get(question)
+            if result is None:
+                result = process_task(compiled_graph, state)
+                if result.get("status") == "done":
+                    disk_cache.set(question, result)
             
             # Display results with thought process
-            console.print("\n[bold]Results:[/bold]")
-            console.print(Panel(
-                f"[bold]Status:[/bold] {result['status']}\n\n[bold]Thought Process:[/bold]\n{result.get('thought_process', 'No thought process recorded')}\n\n[bold]Feedback:[/bold]\n{result['feedback']}",
-                title="Task Results",
-                border_style="green" if result['status'] == "done" else "red"
-            ))
-            
-            console.print()  # Add spacing
+            emit(result)
             
+    except EOFError:
+        # Piped input ran out
+        pass
     except Exception as e:
         logger.error(f"Error in main: {str(e)}")
-        console.print(f"\n[bold red]Error:[/bold red] {str(e)}")
+        if quiet:
+            print(f"Error: {str(e)}")
+        else:
+            console.print(f"\n[bold red]Error:[/bold red] {str(e)}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
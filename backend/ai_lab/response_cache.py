@@ -0,0 +1,122 @@
+"""
+In-process response cache for the agent pipeline.
+Repeated questions are answered from memory instead of re-running every agent.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import os
+import sqlite3
+import time
+import orjson
+
+class SemanticCache:
+    """
+    Bounded LRU cache with a TTL, keyed by the normalized message text.
+    
+    Messages that differ only in case or surrounding whitespace share an
+    entry, so trivial rephrasings of a question still hit.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl: float = 24 * 60 * 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+    
+    @staticmethod
+    def key(message: str) -> str:
+        """Cache key for a message; equal for messages differing only in case or padding."""
+        return hashlib.sha256(message.lower().strip().encode()).hexdigest()[:16]
+    
+    def get(self, message: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached pipeline result.
+        
+        Args:
+            message: The user message
+            
+        Returns:
+            Optional[Dict[str, Any]]: A copy of the cached result, or None on a miss
+        """
+        key = self.key(message)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        result, stored_at = entry
+        if time.monotonic() - stored_at >= self.ttl:
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return dict(result)
+    
+    def set(self, message: str, result: Dict[str, Any]):
+        """
+        Cache a pipeline result for a message, evicting the least recently used entry.
+        
+        Args:
+            message: The user message
+            result: The pipeline result to cache
+        """
+        key = self.key(message)
+        self._entries[key] = (dict(result), time.monotonic())
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop every cached result."""
+        self._entries.clear()
+
+class DiskResponseCache:
+    """
+    SQLite-backed response cache with a TTL that survives restarts.
+    
+    Used by the CLI so questions asked in an earlier session are answered
+    without running the pipeline. Keys match SemanticCache.
+    """
+    
+    def __init__(self, path: str = "~/.ai_lab_cache.db", ttl: float = 24 * 60 * 60):
+        self.ttl = ttl
+        # One connection for the life of the cache
+        self._conn = sqlite3.connect(os.path.expanduser(path), isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache (k TEXT PRIMARY KEY, result BLOB, ts REAL)")
+    
+    def get(self, message: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a stored pipeline result.
+        
+        Args:
+            message: The user message
+            
+        Returns:
+            Optional[Dict[str, Any]]: The stored result, or None if missing or expired
+        """
+        row = self._conn.execute(
+            "SELECT result, ts FROM cache WHERE k = ?", (SemanticCache.key(message),)
+        ).fetchone()
+        if row is None or time.time() - row[1] >= self.ttl:
+            return None
+        return orjson.loads(row[0])
+    
+    def set(self, message: str, result: Dict[str, Any]):
+        """
+        Store a pipeline result for a message, replacing any older one.
+        
+        Args:
+            message: The user message
+            result: The pipeline result to store
+        """
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+            (SemanticCache.key(message), orjson.dumps(dict(result), default=str), time.time())
+        )
+    
+    def close(self):
+        self._conn.close()
+
+# Shared cache for the pipeline entry points
+response_cache = SemanticCache()
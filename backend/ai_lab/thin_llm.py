@@ -0,0 +1,99 @@
+"""
+Thin client for Ollama's OpenAI-compatible chat completions endpoint.
+Exposes the part of the LangChain chat model surface the agents use, invoke and
+ainvoke returning an object with .content, without LangChain's per-call
+validation and Runnable plumbing.
+"""
+
+from typing import Any, Dict, List, Optional
+import httpx
+import orjson
+
+# LangChain message types and tuple roles mapped to OpenAI chat roles
+_ROLES = {
+    "system": "system",
+    "human": "user",
+    "user": "user",
+    "ai": "assistant",
+    "assistant": "assistant"
+}
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+class ChatReply:
+    """Generated text exposed as .content, like a LangChain AIMessage."""
+
+    __slots__ = ("content",)
+
+    def __init__(self, content: str):
+        self.content = content
+
+def to_chat_messages(prompt: Any) -> List[Dict[str, str]]:
+    """
+    Convert a prompt to OpenAI chat messages.
+
+    Args:
+        prompt: A string, or a list of LangChain messages, (role, content)
+            tuples or message dicts
+
+    Returns:
+        List[Dict[str, str]]: Messages with "role" and "content" keys
+    """
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+
+    messages = []
+    for message in prompt:
+        if isinstance(message, dict):
+            messages.append(message)
+        elif isinstance(message, tuple):
+            role, content = message
+            messages.append({"role": _ROLES.get(role, role), "content": content})
+        else:
+            messages.append({"role": _ROLES.get(message.type, "user"), "content": message.content})
+    return messages
+
+class ThinChat:
+    """Chat model client posting straight to /chat/completions over pooled connections."""
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str = "http://localhost:11434/v1",
+        temperature: float = 0.7,
+        timeout: float = 120.0
+    ):
+        self.model = model
+        self.base_url = base_url
+        self.temperature = temperature
+        self.timeout = timeout
+
+        # One pooled client shared by every agent holding this instance
+        self._client = httpx.Client(base_url=base_url, timeout=timeout)
+        # Created on first async use, so it binds to the serving event loop
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    def _payload(self, prompt: Any) -> bytes:
+        return orjson.dumps({
+            "model": self.model,
+            "messages": to_chat_messages(prompt),
+            "temperature": self.temperature,
+            "stream": False
+        })
+
+    @staticmethod
+    def _reply(response: httpx.Response) -> ChatReply:
+        response.raise_for_status()
+        return ChatReply(orjson.loads(response.content)["choices"][0]["message"]["content"])
+
+    def invoke(self, prompt: Any) -> ChatReply:
+        """Generate a reply, blocking until it is complete."""
+        response = self._client.post("/chat/completions", content=self._payload(prompt), headers=_JSON_HEADERS)
+        return self._reply(response)
+
+    async def ainvoke(self, prompt: Any) -> ChatReply:
+        """Generate a reply without blocking the event loop."""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+        response = await self._async_client.post("/chat/completions", content=self._payload(prompt), headers=_JSON_HEADERS)
+        return self._reply(response)
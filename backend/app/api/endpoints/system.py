@@ -1,12 +1,20 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Tuple
+import asyncio
 import psutil
-import GPUtil
+import time
 from datetime import datetime
+from ai_lab.gpu_stats import gpu_snapshot
 
 router = APIRouter()
 
+# Most recent stats sample as (monotonic time, stats), reused for _STATS_TTL seconds
+_STATS_TTL = 1.0
+_last_stats: Optional[Tuple[float, "SystemStats"]] = None
+_stats_lock = asyncio.Lock()
+_sampler_running = False
+
 class GPUStats(BaseModel):
     memory_used: int
     memory_total: int
@@ -17,28 +25,64 @@ class SystemStats(BaseModel):
     gpu: Optional[GPUStats]
     timestamp: str
 
+def _read_gpu_stats() -> Optional[GPUStats]:
+    """Read stats for the first GPU; blocking, so run it in a worker thread."""
+    gpu = gpu_snapshot()
+    if gpu is None:
+        return None
+    
+    return GPUStats(
+        memory_used=int(gpu["memory_used_mb"]),
+        memory_total=int(gpu["memory_total_mb"]),
+        utilization=int(gpu["utilization_percent"]),
+        temperature=float(gpu["temperature_c"])
+    )
+
+async def _refresh_stats() -> SystemStats:
+    """Take a new stats sample and store it as the latest one."""
+    global _last_stats
+    
+    # Get GPU stats if available
+    gpu_stats = None
+    try:
+        loop = asyncio.get_running_loop()
+        gpu_stats = await loop.run_in_executor(None, _read_gpu_stats)
+    except Exception as e:
+        # Log error but don't fail the request
+        print(f"Error getting GPU stats: {e}")
+
+    stats = SystemStats(
+        gpu=gpu_stats,
+        timestamp=datetime.utcnow().isoformat()
+    )
+    _last_stats = (time.monotonic(), stats)
+    return stats
+
+async def stats_sampler(interval: float = 2.0):
+    """Background task that keeps the latest stats sample fresh."""
+    global _sampler_running
+    _sampler_running = True
+    try:
+        while True:
+            await _refresh_stats()
+            await asyncio.sleep(interval)
+    finally:
+        _sampler_running = False
+
 @router.get("/stats", response_model=SystemStats)
 async def get_system_stats():
     try:
-        # Get GPU stats if available
-        gpu_stats = None
-        try:
-            gpus = GPUtil.getGPUs()
-            if gpus:
-                gpu = gpus[0]  # Get first GPU
-                gpu_stats = GPUStats(
-                    memory_used=int(gpu.memoryUsed),
-                    memory_total=int(gpu.memoryTotal),
-                    utilization=int(gpu.load * 100),
-                    temperature=float(gpu.temperature)
-                )
-        except Exception as e:
-            # Log error but don't fail the request
-            print(f"Error getting GPU stats: {e}")
-
-        return SystemStats(
-            gpu=gpu_stats,
-            timestamp=datetime.utcnow().isoformat()
-        )
+        # With the background sampler running, just serve its latest sample
+        if _sampler_running and _last_stats:
+            return _last_stats[1]
+        
+        # Otherwise serve a recent sample, and let concurrent callers share one refresh
+        if _last_stats and time.monotonic() - _last_stats[0] < _STATS_TTL:
+            return _last_stats[1]
+        
+        async with _stats_lock:
+            if _last_stats and time.monotonic() - _last_stats[0] < _STATS_TTL:
+                return _last_stats[1]
+            return await _refresh_stats()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,17 +1,21 @@
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from ai_lab.middleware import FastCORS, cors_origins_from_env
 from app.api.endpoints import system
+from ai_lab.responses import ORJSONResponse
 
-app = FastAPI(title="AI Lab API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sample system stats in the background so /stats never scrapes inline
+    sampler = asyncio.create_task(system.stats_sampler(interval=2.0))
+    yield
+    sampler.cancel()
+
+app = FastAPI(title="AI Lab API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],  # React development server
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(FastCORS, origins=cors_origins_from_env("http://localhost:3000"))  # Defaults to the React development server
 
 # Include routers
 app.include_router(system.router, prefix="/api/system", tags=["system"])
@@ -1,19 +1,25 @@
-from fastapi import FastAPI, Request, HTTPException, Depends
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import PlainTextResponse
-from pydantic import BaseModel
+from fastapi import FastAPI, Request, Response, HTTPException
+from fastapi.responses import StreamingResponse
+from ai_lab.middleware import FastCORS, cors_origins_from_env
+from prometheus_client import CONTENT_TYPE_LATEST
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
+from contextlib import asynccontextmanager
+import asyncio
 import logging
 import sys
-from typing import Optional, Dict, List
+from typing import Callable, Optional, Dict, List
 import time
-from ai_lab.pipeline_graph import create_agent_graph, AgentState
+from ai_lab.pipeline_graph import get_pipeline_graph, process_task_async, process_task_stream, AgentState
 from ai_lab.conversation_db import ConversationManagerDB
 from ai_lab.database import db_manager
 from ai_lab.performance import performance_monitor, monitor_performance
 from ai_lab.api_keys import api_key_manager
-import json
-from pathlib import Path
+from ai_lab.responses import ORJSONResponse
+from ai_lab.ids import uuid7str
+import orjson
 import os
+import sqlite3
+import threading
 
 # Configure logging
 logging.basicConfig(
@@ -23,34 +29,75 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="AI-Lab Backend", version="2.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run blocking database setup at startup and flush queued writes on shutdown."""
+    try:
+        await db_manager.async_init()
+        await db_manager.create_tables()
+        logger.info("Database tables initialized successfully")
+        
+        # Fill the connection pool before the first chat turn needs it
+        await db_manager.warm_pool()
+        
+        # Decrypt all stored API keys in one query to warm the key cache
+        api_keys = await db_manager.get_all_api_keys()
+        logger.info("Loaded %s API keys", len(api_keys))
+    except Exception as e:
+        logger.error("Failed to initialize database: %s", e)
+    
+    # Sample system metrics in the background; endpoints read the snapshot
+    # and one sample a minute is stored in performance_metrics
+    performance_monitor.start_sampler(interval=2.0)
+    
+    # Flush buffered metrics (and push them over UDP if configured) from startup
+    await performance_monitor.start()
+    
+    yield
+    
+    await performance_monitor.stop_sampler()
+    await performance_monitor.stop()
+    
+    try:
+        await db_manager.close_conversation_queue()
+        await db_manager.flush_metrics()
+    except Exception as e:
+        logger.error("Failed to flush queued writes: %s", e)
+
+app = FastAPI(title="AI-Lab Backend", version="2.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Allow frontend to call backend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(FastCORS, origins=cors_origins_from_env())
 
 # Initialize database-backed conversation manager
 conversation_manager = ConversationManagerDB()
 
 # Initialize the agent graph with conversation manager
-pipeline_graph = create_agent_graph(conversation_manager=conversation_manager)
-compiled_graph = pipeline_graph.graph.compile()
-
-# State management
-STATE_DIR = Path("states")
-STATE_DIR.mkdir(exist_ok=True)
-
-def load_state(session_id: str) -> Dict:
-    """Load state for a session."""
-    state_file = STATE_DIR / f"{session_id}.json"
-    if state_file.exists():
-        with open(state_file, "r") as f:
-            return json.load(f)
+pipeline_graph = get_pipeline_graph(conversation_manager=conversation_manager)
+compiled_graph = pipeline_graph.compile()
+
+# State management: one SQLite table instead of a JSON file per session.
+# Reads and writes run in worker threads, serialized on one connection.
+STATE_DB = sqlite3.connect(os.getenv("STATE_DB_PATH", "states.db"), isolation_level=None, check_same_thread=False)
+STATE_DB.execute("PRAGMA journal_mode=WAL")
+STATE_DB.execute("PRAGMA synchronous=NORMAL")
+STATE_DB.execute("CREATE TABLE IF NOT EXISTS states (session_id TEXT PRIMARY KEY, blob BLOB)")
+_state_lock = threading.Lock()
+
+def _read_state(session_id: str) -> Optional[bytes]:
+    with _state_lock:
+        row = STATE_DB.execute("SELECT blob FROM states WHERE session_id = ?", (session_id,)).fetchone()
+    return row[0] if row else None
+
+def _write_state(session_id: str, blob: bytes):
+    with _state_lock:
+        STATE_DB.execute("INSERT OR REPLACE INTO states VALUES (?, ?)", (session_id, blob))
+
+async def load_state(session_id: str) -> Dict:
+    """Load state for a session without blocking the event loop."""
+    blob = await asyncio.to_thread(_read_state, session_id)
+    if blob:
+        return orjson.loads(blob)
     return {
         "message": "",
         "status": "pending",
@@ -58,17 +105,37 @@ def load_state(session_id: str) -> Dict:
         "thought_process": ""
     }
 
-def save_state(session_id: str, state: Dict):
-    """Save state for a session."""
-    state_file = STATE_DIR / f"{session_id}.json"
-    with open(state_file, "w") as f:
-        json.dump(state, f)
+async def save_state(session_id: str, state: Dict):
+    """Save state for a session without blocking the event loop."""
+    await asyncio.to_thread(_write_state, session_id, orjson.dumps(state))
+
+def _bind_state_extractor(result) -> Optional[Callable]:
+    """
+    Pick how to turn a pipeline result into an AgentState.
+    
+    The result type depends only on the LangGraph version, so this runs on the
+    first result and the chosen function is reused for every later request.
+    """
+    if isinstance(result, dict):
+        # Usually an AddableValuesDict
+        return AgentState.from_dict
+    if hasattr(result, 'message'):
+        return lambda r: r
+    if hasattr(result, 'keys'):
+        return lambda r: AgentState.from_dict(dict(r))
+    return None
+
+_extract_state: Optional[Callable] = None
 
 class ChatRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     message: str
     session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     response: str
     status: str = "success"
     error: Optional[str] = None
@@ -84,60 +151,59 @@ class APIKeyResponse(BaseModel):
     message: str
     service_name: str
 
-# Startup event to initialize database
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database tables on startup."""
-    try:
-        await db_manager.create_tables()
-        logger.info("Database tables initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
+# The root payload never changes, so one pre-encoded response serves every call
+_ROOT_RESPONSE = Response(
+    orjson.dumps({"message": "AI-Lab backend v2.0 is running!", "status": "healthy", "features": ["database", "performance_monitoring", "api_key_management"]}),
+    media_type="application/json"
+)
 
 @app.get("/")
 def read_root():
-    return {"message": "AI-Lab backend v2.0 is running!", "status": "healthy", "features": ["database", "performance_monitoring", "api_key_management"]}
+    return _ROOT_RESPONSE
 
-@app.post("/chat", response_model=ChatResponse)
-@monitor_performance("chat_endpoint")
-async def chat_endpoint(chat: ChatRequest):
-    try:
-        logger.info(f"Received chat request: {chat.message}")
-        
-        # Generate session ID if not provided
-        session_id = chat.session_id or str(int(time.time()))
-        
-        # Add user message to conversation history (database)
-        await conversation_manager.add_message(
-            session_id,
-            "User",
-            chat.message
-        )
-        
-        # Initialize state with session ID
-        state = AgentState(
-            message=chat.message,
-            status="pending",
-            feedback="",
-            thought_process="",
-            session_id=session_id
-        )
+def _initial_state(chat: ChatRequest) -> Dict:
+    """Build the pipeline input for one chat message, assigning a session ID if needed."""
+    # LangGraph maps the keys onto AgentState
+    return {
+        "message": chat.message,
+        "status": "pending",
+        "feedback": "",
+        "thought_process": "",
+        "session_id": chat.session_id or uuid7str()
+    }
+
+def _error_payload(e: Exception, session_id: Optional[str]) -> Dict:
+    return {
+        "response": "Sorry, there was an error processing your request. Please try again.",
+        "status": "error",
+        "error": str(e),
+        "thought_process": None,
+        "session_id": session_id
+    }
+
+async def _finish_chat(chat: ChatRequest, state: Dict, result) -> Dict:
+    """
+    Persist one pipeline result and build its response payload.
+    
+    Args:
+        chat: The validated request
+        state: The initial state passed to the pipeline
+        result: The pipeline return value, or the exception it raised
         
-        # Process through agent pipeline
-        result = compiled_graph.invoke(state)
+    Returns:
+        Dict: The ChatResponse-shaped payload
+    """
+    session_id = state["session_id"]
+    try:
+        if isinstance(result, Exception):
+            raise result
         
-        # Handle LangGraph return value (could be AddableValuesDict)
-        if hasattr(result, '__dict__'):
-            # If it's an object with attributes, convert to our AgentState
-            if hasattr(result, 'message'):
-                result_state = result
-            else:
-                # If it doesn't have the expected attributes, check the dict values
-                result_dict = dict(result) if hasattr(result, 'keys') else {}
-                result_state = AgentState.from_dict(result_dict)
-        elif isinstance(result, dict):
-            # If it's a dictionary, convert to AgentState
-            result_state = AgentState.from_dict(result)
+        # Convert the LangGraph return value with the extractor bound to its type
+        global _extract_state
+        if _extract_state is None:
+            _extract_state = _bind_state_extractor(result)
+        if _extract_state is not None:
+            result_state = _extract_state(result)
         else:
             # Fallback for unexpected types
             result_state = AgentState(
@@ -148,43 +214,154 @@ async def chat_endpoint(chat: ChatRequest):
                 session_id=session_id
             )
         
-        # Save agent state to database
-        await conversation_manager.save_agent_state(
-            session_id,
-            result_state.message,
-            result_state.status,
-            result_state.feedback,
-            result_state.thought_process
-        )
-        
-        # Add assistant response to conversation history
-        await conversation_manager.add_message(
-            session_id,
-            "Assistant",
-            result_state.feedback,
-            result_state.thought_process
-        )
-        
-        # Prepare response
-        response = result_state.feedback
-        thought_process = result_state.thought_process
+        # One session and transaction covers all of this turn's DB writes
+        async with db_manager.transaction() as session:
+            # Save agent state to database
+            await conversation_manager.save_agent_state(
+                session_id,
+                result_state.message,
+                result_state.status,
+                result_state.feedback,
+                result_state.thought_process,
+                session=session
+            )
+            
+            # Write the user message and assistant response in one batch
+            await conversation_manager.add_messages(session_id, [
+                {"role": "User", "content": chat.message},
+                {
+                    "role": "Assistant",
+                    "content": result_state.feedback,
+                    "thought_process": result_state.thought_process
+                }
+            ], session=session)
         
-        logger.info(f"Sending response: {response}")
-        return ChatResponse(
-            response=response,
-            status="success",
-            thought_process=thought_process,
-            session_id=session_id
-        )
+        logger.info("Sending response: %s", result_state.feedback)
+        return {
+            "response": result_state.feedback,
+            "status": "success",
+            "error": None,
+            "thought_process": result_state.thought_process,
+            "session_id": session_id
+        }
         
     except Exception as e:
-        logger.error(f"Error processing chat request: {str(e)}")
-        return ChatResponse(
-            response="Sorry, there was an error processing your request. Please try again.",
-            status="error",
-            error=str(e),
-            session_id=session_id if 'session_id' in locals() else None
-        )
+        logger.error("Error processing chat request: %s", e)
+        return _error_payload(e, session_id)
+
+@app.post(
+    "/chat",
+    responses={200: {"model": ChatResponse}},
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": ChatRequest.model_json_schema()}}
+    }}
+)
+@monitor_performance("chat_endpoint")
+async def chat_endpoint(request: Request):
+    # Validate the raw body in a single pydantic-core pass
+    try:
+        chat = ChatRequest.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    
+    try:
+        logger.info("Received chat request: %s", chat.message)
+        state = _initial_state(chat)
+    except Exception as e:
+        logger.error("Error processing chat request: %s", e)
+        return Response(orjson.dumps(_error_payload(e, None)), media_type="application/json")
+    
+    # Process through the agent pipeline asynchronously; LangGraph runs the
+    # agents' blocking LLM calls in executor threads so the event loop stays free.
+    # Identical concurrent requests for a session share one run.
+    try:
+        result = await process_task_async(compiled_graph, state, use_cache=False)
+    except Exception as e:
+        result = e
+    
+    # Encode the body once here instead of validating a ChatResponse
+    payload = await _finish_chat(chat, state, result)
+    return Response(orjson.dumps(payload), media_type="application/json")
+
+def _sse(event: str, data) -> bytes:
+    """Encode one Server-Sent Event."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+@app.post(
+    "/chat/stream",
+    response_class=StreamingResponse,
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": ChatRequest.model_json_schema()}}
+    }}
+)
+async def chat_stream_endpoint(request: Request):
+    """
+    Stream each agent step as a "node" event, then the ChatResponse payload
+    as a final "done" event once the turn has been saved.
+    """
+    try:
+        chat = ChatRequest.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    
+    logger.info("Received streaming chat request: %s", chat.message)
+    state = _initial_state(chat)
+    
+    async def events():
+        final_state = dict(state)
+        try:
+            async for node, update in process_task_stream(compiled_graph, state):
+                final_state.update(update)
+                yield _sse("node", {"node": node, **update})
+            result = final_state
+        except Exception as e:
+            result = e
+        yield _sse("done", await _finish_chat(chat, state, result))
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+_batch_adapter = TypeAdapter(List[ChatRequest])
+# Longest batch one request may submit
+MAX_BATCH_SIZE = 32
+
+@app.post(
+    "/chat/batch",
+    responses={200: {"model": List[ChatResponse]}},
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": _batch_adapter.json_schema()}}
+    }}
+)
+@monitor_performance("chat_batch_endpoint")
+async def chat_batch_endpoint(request: Request):
+    """Process several chat messages in one round trip; responses keep request order."""
+    try:
+        chats = _batch_adapter.validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    if len(chats) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"A batch holds at most {MAX_BATCH_SIZE} messages")
+    
+    logger.info("Received chat batch of %s messages", len(chats))
+    states = [_initial_state(chat) for chat in chats]
+    
+    # One graph batch call runs the messages concurrently, a few at a time
+    try:
+        results = await pipeline_graph.run_batch(states)
+    except Exception as e:
+        results = [e] * len(states)
+    
+    payloads = await asyncio.gather(*[
+        _finish_chat(chat, state, result)
+        for chat, state, result in zip(chats, states, results)
+    ])
+    return Response(orjson.dumps(payloads), media_type="application/json")
 
 @app.get("/conversation/{session_id}")
 async def get_conversation(session_id: str):
@@ -193,7 +370,7 @@ async def get_conversation(session_id: str):
         history = await conversation_manager.get_history(session_id)
         return {"history": history}
     except Exception as e:
-        logger.error(f"Error getting conversation history: {str(e)}")
+        logger.error("Error getting conversation history: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/conversation/{session_id}")
@@ -203,7 +380,7 @@ async def clear_conversation(session_id: str):
         await conversation_manager.clear_history(session_id)
         return {"status": "success", "message": "Conversation history cleared"}
     except Exception as e:
-        logger.error(f"Error clearing conversation history: {str(e)}")
+        logger.error("Error clearing conversation history: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # API Key Management Endpoints
@@ -227,7 +404,7 @@ async def store_api_key(request: APIKeyRequest):
             service_name=request.service_name
         )
     except Exception as e:
-        logger.error(f"Error storing API key: {e}")
+        logger.error("Error storing API key: %s", e)
         return APIKeyResponse(
             success=False,
             message=f"Error: {str(e)}",
@@ -246,7 +423,7 @@ async def list_api_keys():
             "supported_services": supported
         }
     except Exception as e:
-        logger.error(f"Error listing API keys: {e}")
+        logger.error("Error listing API keys: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api-keys/{service_name}/test")
@@ -265,7 +442,7 @@ async def test_api_key(service_name: str):
         result = await api_key_manager.test_api_key(service_name, stored_api_key)
         return result
     except Exception as e:
-        logger.error(f"Error testing API key: {e}")
+        logger.error("Error testing API key: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api-keys/{service_name}")
@@ -278,7 +455,7 @@ async def remove_api_key(service_name: str):
             "message": "API key removed successfully" if success else "Failed to remove API key"
         }
     except Exception as e:
-        logger.error(f"Error removing API key: {e}")
+        logger.error("Error removing API key: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # Performance Monitoring Endpoints
@@ -286,19 +463,26 @@ async def remove_api_key(service_name: str):
 async def get_metrics():
     """Get current system metrics."""
     try:
-        return await performance_monitor.collect_system_metrics()
+        return await performance_monitor.get_system_snapshot()
     except Exception as e:
-        logger.error(f"Error getting metrics: {e}")
+        logger.error("Error getting metrics: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+PROMETHEUS_CACHE_TTL = 1.0
+_prom_cache = (float("-inf"), b"")
+
 @app.get("/metrics/prometheus")
 async def get_prometheus_metrics():
     """Get Prometheus-formatted metrics."""
+    global _prom_cache
     try:
-        metrics = performance_monitor.get_prometheus_metrics()
-        return PlainTextResponse(metrics, media_type="text/plain")
+        # Scrapes within a second share one rendering of the registry
+        now = time.monotonic()
+        if now - _prom_cache[0] >= PROMETHEUS_CACHE_TTL:
+            _prom_cache = (now, performance_monitor.get_prometheus_metrics())
+        return Response(_prom_cache[1], media_type=CONTENT_TYPE_LATEST)
     except Exception as e:
-        logger.error(f"Error getting Prometheus metrics: {e}")
+        logger.error("Error getting Prometheus metrics: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/performance/summary")
@@ -307,16 +491,16 @@ async def get_performance_summary(hours: int = 24):
     try:
         return await performance_monitor.get_performance_summary(hours)
     except Exception as e:
-        logger.error(f"Error getting performance summary: {e}")
+        logger.error("Error getting performance summary: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/benchmark/llm")
-async def benchmark_llm(model_name: str = "default", prompt: str = "Hello, world!", iterations: int = 5):
+async def benchmark_llm(model_name: str = "default", prompt: str = "Hello, world!", iterations: int = 5, concurrency: int = 4):
     """Benchmark LLM inference performance."""
     try:
-        return await performance_monitor.benchmark_llm_inference(model_name, prompt, iterations)
+        return await performance_monitor.benchmark_llm_inference(model_name, prompt, iterations, concurrency)
     except Exception as e:
-        logger.error(f"Error running LLM benchmark: {e}")
+        logger.error("Error running LLM benchmark: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # Enhanced health check endpoint
@@ -324,7 +508,7 @@ async def benchmark_llm(model_name: str = "default", prompt: str = "Hello, world
 async def health_check():
     """Health check with system information."""
     try:
-        metrics = await performance_monitor.collect_system_metrics()
+        metrics = await performance_monitor.get_system_snapshot()
         return {
             "status": "healthy", 
             "timestamp": time.time(),
@@ -332,7 +516,7 @@ async def health_check():
             "metrics": metrics
         }
     except Exception as e:
-        logger.error(f"Health check failed: {e}")
+        logger.error("Health check failed: %s", e)
         return {
             "status": "unhealthy",
             "timestamp": time.time(),
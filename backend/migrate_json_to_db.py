@@ -4,11 +4,14 @@ Migration utility to transfer JSON conversation data to PostgreSQL database.
 """
 
 import asyncio
-import json
+import mmap
+import orjson
 import os
+import shutil
 import sys
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import List
 import logging
 
 # Add the backend directory to Python path
@@ -16,9 +19,35 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from ai_lab.database import db_manager
 
+try:
+    import cysimdjson
+except ImportError:
+    cysimdjson = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# One SIMD parser reused for the whole run; below this size orjson is faster
+_simd_parser = cysimdjson.JSONParser() if cysimdjson is not None else None
+SIMDJSON_MIN_BYTES = 2048
+
+# Files migrated at once; keep at or below the database pool size
+MIGRATION_CONCURRENCY = 16
+
+def list_json_files(directory: Path) -> List[Path]:
+    """List the JSON files in a directory without stat-ing every entry."""
+    with os.scandir(directory) as entries:
+        return [Path(entry.path) for entry in entries if entry.name.endswith(".json") and entry.is_file()]
+
+def load_json_file(json_file: Path):
+    """Parse a JSON file, using simdjson for larger files when available."""
+    with open(json_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if _simd_parser is not None and len(mm) >= SIMDJSON_MIN_BYTES:
+            # simdjson needs a padded buffer, so it takes its own copy anyway
+            return _simd_parser.parse(mm[:]).export()
+        # orjson parses straight from the mapped pages
+        return orjson.loads(memoryview(mm))
+
 async def migrate_conversations():
     """Migrate conversation files from JSON to database."""
     conversations_dir = Path("conversations")
@@ -27,18 +56,23 @@ async def migrate_conversations():
         logger.info("No conversations directory found")
         return 0
     
-    json_files = list(conversations_dir.glob("*.json"))
+    json_files = list_json_files(conversations_dir)
     if not json_files:
         logger.info("No JSON conversation files found")
         return 0
     
     logger.info(f"Found {len(json_files)} conversation files to migrate")
-    migrated_count = 0
     
-    for json_file in json_files:
+    # Files are independent, so migrate them concurrently up to a bound
+    sem = asyncio.Semaphore(MIGRATION_CONCURRENCY)
+    results = await asyncio.gather(*[migrate_conversation_file(f, sem) for f in json_files])
+    return sum(results)
+
+async def migrate_conversation_file(json_file: Path, sem: asyncio.Semaphore) -> bool:
+    """Migrate one conversation file, returning whether it succeeded."""
+    async with sem:
         try:
-            with open(json_file, 'r') as f:
-                conversation_data = json.load(f)
+            conversation_data = load_json_file(json_file)
             
             # Extract session ID from filename
             session_id = json_file.stem
@@ -46,57 +80,60 @@ async def migrate_conversations():
             # Handle different JSON formats
             if isinstance(conversation_data, list):
                 # Format: list of messages
-                for message in conversation_data:
-                    await migrate_single_message(session_id, message)
+                messages = conversation_data
             elif isinstance(conversation_data, dict):
                 # Format: single message or conversation object
                 if 'messages' in conversation_data:
                     # Contains a messages array
-                    for message in conversation_data['messages']:
-                        await migrate_single_message(session_id, message)
+                    messages = conversation_data['messages']
                 else:
                     # Single message object
-                    await migrate_single_message(session_id, conversation_data)
+                    messages = [conversation_data]
+            else:
+                messages = []
+            
+            # Insert the whole file in one transaction
+            await db_manager.add_conversation_messages([
+                build_message_row(session_id, message) for message in messages
+            ])
             
-            migrated_count += 1
             logger.info(f"✅ Migrated {json_file.name}")
+            return True
             
         except Exception as e:
             logger.error(f"❌ Failed to migrate {json_file.name}: {e}")
-    
-    return migrated_count
+            return False
 
-async def migrate_single_message(session_id: str, message_data: dict):
-    """Migrate a single message to the database."""
-    try:
-        # Extract message fields with defaults
-        role = message_data.get('role', 'unknown')
-        content = message_data.get('content', message_data.get('message', ''))
-        thought_process = message_data.get('thought_process')
-        
-        # Handle timestamp
-        timestamp_str = message_data.get('timestamp')
-        if timestamp_str:
-            try:
-                # Try to parse ISO format
-                timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-            except:
-                # Fallback to current time
-                timestamp = datetime.utcnow()
-        else:
-            timestamp = datetime.utcnow()
-        
-        # Add to database
-        await db_manager.add_conversation_message(
-            session_id=session_id,
-            role=role,
-            content=content,
-            thought_process=thought_process
-        )
-        
-    except Exception as e:
-        logger.error(f"Error migrating message: {e}")
-        raise
+def build_message_row(session_id: str, message_data: dict) -> dict:
+    """Build a conversation row from a JSON message."""
+    # Extract message fields with defaults
+    role = message_data.get('role', 'unknown')
+    content = message_data.get('content', message_data.get('message', ''))
+    thought_process = message_data.get('thought_process')
+    
+    # Handle timestamp
+    timestamp_str = message_data.get('timestamp')
+    if timestamp_str:
+        try:
+            # Try to parse ISO format; naive values are taken as UTC
+            timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            else:
+                timestamp = timestamp.astimezone(timezone.utc)
+        except:
+            # Fallback to current time
+            timestamp = datetime.now(timezone.utc)
+    else:
+        timestamp = datetime.now(timezone.utc)
+    
+    return {
+        "session_id": session_id,
+        "role": role,
+        "content": content,
+        "thought_process": thought_process,
+        "timestamp": timestamp
+    }
 
 async def migrate_agent_states():
     """Migrate agent state files from JSON to database."""
@@ -106,18 +143,22 @@ async def migrate_agent_states():
         logger.info("No states directory found")
         return 0
     
-    json_files = list(states_dir.glob("*.json"))
+    json_files = list_json_files(states_dir)
     if not json_files:
         logger.info("No JSON state files found")
         return 0
     
     logger.info(f"Found {len(json_files)} state files to migrate")
-    migrated_count = 0
     
-    for json_file in json_files:
+    sem = asyncio.Semaphore(MIGRATION_CONCURRENCY)
+    results = await asyncio.gather(*[migrate_state_file(f, sem) for f in json_files])
+    return sum(results)
+
+async def migrate_state_file(json_file: Path, sem: asyncio.Semaphore) -> bool:
+    """Migrate one agent state file, returning whether it succeeded."""
+    async with sem:
         try:
-            with open(json_file, 'r') as f:
-                state_data = json.load(f)
+            state_data = load_json_file(json_file)
             
             # Extract session ID from filename
             session_id = json_file.stem
@@ -131,34 +172,40 @@ async def migrate_agent_states():
                 thought_process=state_data.get('thought_process', '')
             )
             
-            migrated_count += 1
             logger.info(f"✅ Migrated state {json_file.name}")
+            return True
             
         except Exception as e:
             logger.error(f"❌ Failed to migrate state {json_file.name}: {e}")
-    
-    return migrated_count
+            return False
 
 async def backup_json_files():
     """Create a backup of JSON files before migration."""
     backup_dir = Path("json_backup")
     backup_dir.mkdir(exist_ok=True)
     
+    copies = []
+    
     # Backup conversations
     conversations_dir = Path("conversations")
     if conversations_dir.exists():
-        for json_file in conversations_dir.glob("*.json"):
-            backup_file = backup_dir / f"conversations_{json_file.name}"
-            with open(json_file, 'r') as src, open(backup_file, 'w') as dst:
-                dst.write(src.read())
+        for json_file in list_json_files(conversations_dir):
+            copies.append((json_file, backup_dir / f"conversations_{json_file.name}"))
     
     # Backup states
     states_dir = Path("states")
     if states_dir.exists():
-        for json_file in states_dir.glob("*.json"):
-            backup_file = backup_dir / f"states_{json_file.name}"
-            with open(json_file, 'r') as src, open(backup_file, 'w') as dst:
-                dst.write(src.read())
+        for json_file in list_json_files(states_dir):
+            copies.append((json_file, backup_dir / f"states_{json_file.name}"))
+    
+    # copyfile uses the kernel's zero-copy paths; run the copies in parallel threads
+    sem = asyncio.Semaphore(MIGRATION_CONCURRENCY)
+    
+    async def copy(src: Path, dst: Path):
+        async with sem:
+            await asyncio.to_thread(shutil.copyfile, src, dst)
+    
+    await asyncio.gather(*[copy(src, dst) for src, dst in copies])
     
     logger.info(f"✅ JSON files backed up to {backup_dir}")
 
@@ -170,6 +217,7 @@ async def main():
     # Check database connection
     try:
         await db_manager.create_tables()
+        await db_manager.warm_pool(MIGRATION_CONCURRENCY)
         logger.info("✅ Database connection successful")
     except Exception as e:
         logger.error(f"❌ Database connection failed: {e}")
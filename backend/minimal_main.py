@@ -1,18 +1,14 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, Response
+from ai_lab.middleware import FastCORS, cors_origins_from_env
 from pydantic import BaseModel
 import time
+from ai_lab.responses import ORJSONResponse
+from ai_lab.ids import uuid7str
 
-app = FastAPI(title="AI-Lab Backend - Minimal")
+app = FastAPI(title="AI-Lab Backend - Minimal", default_response_class=ORJSONResponse)
 
 # Allow frontend to call backend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(FastCORS, origins=cors_origins_from_env())
 
 class ChatRequest(BaseModel):
     message: str
@@ -25,13 +21,17 @@ class ChatResponse(BaseModel):
     thought_process: str = None
     session_id: str = None
 
+# Static payloads are encoded once; /health only appends its timestamp
+_ROOT_RESPONSE = Response(b'{"message":"AI-Lab backend is running!","status":"healthy"}', media_type="application/json")
+_HEALTH_PREFIX = b'{"status":"healthy","timestamp":'
+
 @app.get("/")
 def read_root():
-    return {"message": "AI-Lab backend is running!", "status": "healthy"}
+    return _ROOT_RESPONSE
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "timestamp": time.time()}
+    return Response(_HEALTH_PREFIX + f"{time.time()}}}".encode(), media_type="application/json")
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(chat: ChatRequest):
@@ -40,5 +40,5 @@ async def chat_endpoint(chat: ChatRequest):
         response=f"Echo: {chat.message}",
         status="success",
         thought_process="This is a simple echo response for testing",
-        session_id=chat.session_id or str(int(time.time()))
+        session_id=chat.session_id or uuid7str()
     ) 
\ No newline at end of file
@@ -4,6 +4,7 @@ Script to run the FastAPI server with uvicorn.
 
 import uvicorn
 import logging
+from importlib.util import find_spec
 from ai_lab.config.config_manager import ConfigManager
 
 # Configure logging
@@ -25,11 +26,20 @@ def main():
             "host": config.server.host,
             "port": config.server.port,
             "reload": config.server.reload,
+            # WebSocket connections are tracked in process memory, so workers
+            # can't route messages to each other's sockets; default is one
             "workers": config.server.workers,
+            # libuv event loop and C HTTP parser when installed
+            "loop": "uvloop" if find_spec("uvloop") else "asyncio",
+            "http": "httptools" if find_spec("httptools") else "h11",
+            "interface": "asgi3",
+            # Cap in-flight requests and deepen the accept queue for slow LLM calls
+            "limit_concurrency": 1024,
+            "backlog": 2048,
             "log_level": "info",
             "access_log": True,
-            "proxy_headers": True,
-            "forwarded_allow_ips": "*"
+            # X-Forwarded-* is only trusted from FORWARDED_ALLOW_IPS (default 127.0.0.1)
+            "proxy_headers": True
         }
         
         logger.info(f"Starting server on {config.server.host}:{config.server.port}")
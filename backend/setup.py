@@ -7,8 +7,11 @@ setup(
     install_requires=[
         "fastapi",
         "uvicorn",
+        "uvloop; sys_platform != 'win32'",
+        "httptools",
+        "orjson",
         "langchain",
-        "langchain-openai",
+        "httpx",
         "langgraph",
         "rich",
     ],
@@ -1,6 +1,10 @@
 import requests
 import json
 
+# One pooled connection shared by every request
+session = requests.Session()
+session.headers.update({"Content-Type": "application/json"})
+
 def test_chat():
     url = "http://localhost:8001/chat"
     payload = {
@@ -8,12 +12,8 @@ def test_chat():
         "session_id": "test123"
     }
     
-    headers = {
-        "Content-Type": "application/json"
-    }
-    
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = session.post(url, json=payload)
         print(f"Status Code: {response.status_code}")
         print(f"Response: {response.json()}")
         return response.status_code == 200
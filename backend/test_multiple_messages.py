@@ -1,43 +1,42 @@
-import requests
+import asyncio
+import httpx
 import json
 import time
 
-def test_message(message, session_id="test_session"):
-    url = "http://localhost:8001/chat"
-    payload = {
-        "message": message,
-        "session_id": session_id
-    }
-    
-    headers = {
-        "Content-Type": "application/json"
-    }
-    
+def print_result(message, data):
+    print(f"Message: {message}")
+    if data['status'] == "success":
+        print(f"Response: {data['response'][:100]}...")
+        print(f"Status: {data['status']}")
+        if data['thought_process']:
+            print(f"Thought Process: {data['thought_process'][:100]}...")
+        print("-" * 80)
+        return True
+    else:
+        print(f"Error: {data['error']}")
+        print("-" * 80)
+        return False
+
+async def test_batch_async(client, messages, session_id="test_session"):
+    url = "http://localhost:8001/chat/batch"
+    payload = [{"message": message, "session_id": session_id} for message in messages]
+
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        print(f"Message: {message}")
+        response = await client.post(url, json=payload, timeout=120)
         print(f"Status Code: {response.status_code}")
-        if response.status_code == 200:
-            data = response.json()
-            print(f"Response: {data['response'][:100]}...")
-            print(f"Status: {data['status']}")
-            if data['thought_process']:
-                print(f"Thought Process: {data['thought_process'][:100]}...")
-            print("-" * 80)
-            return True
-        else:
+        if response.status_code != 200:
             print(f"Error: {response.text}")
-            print("-" * 80)
-            return False
+            return [False] * len(messages)
+        return [print_result(message, data) for message, data in zip(messages, response.json())]
     except Exception as e:
         print(f"Error: {e}")
         print("-" * 80)
-        return False
+        return [False] * len(messages)
 
 def main():
     print("Testing AI-Lab backend with multiple message types...")
     print("=" * 80)
-    
+
     test_messages = [
         "Hi",
         "Tell me about your organization structure",
@@ -45,17 +44,18 @@ def main():
         "Can you review this code?",
         "What's your strategy for AI development?",
     ]
-    
+
     session_id = f"test_{int(time.time())}"
-    results = []
-    
-    for message in test_messages:
-        success = test_message(message, session_id)
-        results.append(success)
-        time.sleep(1)  # Small delay between requests
-    
+
+    # Send every message in one request; the server runs them concurrently
+    async def run():
+        async with httpx.AsyncClient() as client:
+            return await test_batch_async(client, test_messages, session_id)
+
+    results = asyncio.run(run())
+
     print(f"Test Results: {sum(results)}/{len(results)} tests passed")
     print("All tests completed!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,101 @@
+"""
+Shared fixtures for the backend tests.
+"""
+
+import importlib
+import importlib.util
+import sys
+import types
+
+import pytest
+
+
+def _torch_stub():
+    torch = types.ModuleType("torch")
+    torch.cuda = types.SimpleNamespace(
+        set_device=lambda *a, **k: None,
+        get_device_properties=lambda *a, **k: types.SimpleNamespace(name="stub", total_memory=1),
+        empty_cache=lambda: None,
+        memory_stats=lambda *a, **k: {"allocated_bytes.all.current": 0},
+        set_per_process_memory_fraction=lambda *a, **k: None,
+    )
+    torch.nn = types.SimpleNamespace(Module=object)
+    torch.Tensor = object
+    return torch
+
+
+def _cupy_stub():
+    cupy = types.ModuleType("cupy")
+    cupy.cuda = types.SimpleNamespace(
+        Device=lambda *a, **k: types.SimpleNamespace(use=lambda: None),
+        MemoryPool=lambda: types.SimpleNamespace(malloc=lambda *a, **k: None, free_all_blocks=lambda: None),
+        set_allocator=lambda *a, **k: None,
+    )
+    return cupy
+
+
+def _numpy_stub():
+    return types.ModuleType("numpy")
+
+
+def _aioredis_stub():
+    aioredis = types.ModuleType("aioredis")
+    aioredis.Redis = object
+    aioredis.from_url = lambda *a, **k: types.SimpleNamespace(
+        ping=lambda: None,
+        publish=lambda *a, **k: None,
+        setex=lambda *a, **k: None,
+        keys=lambda *a, **k: [],
+        get=lambda *a, **k: None,
+        delete=lambda *a, **k: None,
+        close=lambda: None,
+        pubsub=lambda: types.SimpleNamespace(
+            subscribe=lambda *a, **k: None,
+            unsubscribe=lambda *a, **k: None,
+            get_message=lambda *a, **k: None,
+            close=lambda: None,
+        ),
+    )
+    return aioredis
+
+
+# Heavy GPU and Redis dependencies, stubbed only where they aren't installed
+_STUBS = {
+    "torch": _torch_stub,
+    "cupy": _cupy_stub,
+    "numpy": _numpy_stub,
+    "aioredis": _aioredis_stub,
+}
+
+
+def _lazy_module(name):
+    """Return the installed module, executed on first attribute access, or None."""
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return None
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session", autouse=True)
+def optional_dependencies():
+    """Install the dependency stubs once per session and remove them afterwards."""
+    with pytest.MonkeyPatch.context() as mp:
+        for name, make_stub in _STUBS.items():
+            if name in sys.modules:
+                continue
+            mp.setitem(sys.modules, name, _lazy_module(name) or make_stub())
+        yield
+
+
+@pytest.fixture(scope="session")
+def api_app(optional_dependencies):
+    """The API application module, imported once the stubs are in place."""
+    module = importlib.import_module("ai_lab.api.app")
+
+    # Disable startup and shutdown events to avoid external connections during tests
+    module.app.router.on_startup.clear()
+    module.app.router.on_shutdown.clear()
+    return module
@@ -5,56 +5,8 @@ Tests for the FastAPI application.
 import pytest
 from fastapi.testclient import TestClient
 import types
-import sys
 import uuid
 
-# Provide lightweight stubs for optional GPU dependencies so the app can be
-# imported without requiring heavy libraries such as torch or cupy.
-torch_stub = types.ModuleType("torch")
-torch_stub.cuda = types.SimpleNamespace(
-    set_device=lambda *a, **k: None,
-    get_device_properties=lambda *a, **k: types.SimpleNamespace(name="stub", total_memory=1),
-    empty_cache=lambda: None,
-    memory_stats=lambda *a, **k: {"allocated_bytes.all.current": 0},
-    set_per_process_memory_fraction=lambda *a, **k: None,
-)
-torch_stub.nn = types.SimpleNamespace(Module=object)
-torch_stub.Tensor = object
-sys.modules.setdefault("torch", torch_stub)
-
-cupy_stub = types.ModuleType("cupy")
-cupy_stub.cuda = types.SimpleNamespace(
-    Device=lambda *a, **k: types.SimpleNamespace(use=lambda: None),
-    MemoryPool=lambda: types.SimpleNamespace(malloc=lambda *a, **k: None, free_all_blocks=lambda: None),
-    set_allocator=lambda *a, **k: None,
-)
-sys.modules.setdefault("cupy", cupy_stub)
-
-numpy_stub = types.ModuleType("numpy")
-sys.modules.setdefault("numpy", numpy_stub)
-
-# Provide a stub for aioredis to avoid heavy dependencies
-aioredis_stub = types.ModuleType("aioredis")
-aioredis_stub.Redis = object
-aioredis_stub.from_url = lambda *a, **k: types.SimpleNamespace(
-    ping=lambda: None,
-    publish=lambda *a, **k: None,
-    setex=lambda *a, **k: None,
-    keys=lambda *a, **k: [],
-    get=lambda *a, **k: None,
-    delete=lambda *a, **k: None,
-    close=lambda: None,
-    pubsub=lambda: types.SimpleNamespace(
-        subscribe=lambda *a, **k: None,
-        unsubscribe=lambda *a, **k: None,
-        get_message=lambda *a, **k: None,
-        close=lambda: None,
-    ),
-)
-sys.modules.setdefault("aioredis", aioredis_stub)
-
-import ai_lab.api.app as api_app
-from ai_lab.api.app import app
 from ai_lab.models.base import (
     AgentMessage,
     AgentStatus,
@@ -63,29 +15,32 @@ from ai_lab.models.base import (
     MessageType,
 )
 
-# Ensure missing globals referenced in api_app are available during tests
-api_app.AgentState = AgentState
+def _async_returning(value):
+    """Build an async stub that ignores its arguments and returns value."""
+    async def stub(*args, **kwargs):
+        return value
+    return stub
 
-# Disable startup and shutdown events to avoid external connections during tests
-app.router.on_startup.clear()
-app.router.on_shutdown.clear()
+@pytest.fixture(scope="session")
+def client(api_app):
+    """One TestClient shared by every test in the session."""
+    # Ensure missing globals referenced in api_app are available during tests
+    api_app.AgentState = AgentState
 
-client = TestClient(app)
+    with TestClient(api_app.app) as test_client:
+        yield test_client
 
-def test_get_agents():
+def test_get_agents(client, api_app, monkeypatch):
     """Test getting all agents."""
     test_agent = AgentStatus(id=uuid.uuid4(), role=AgentRole.WORKER)
 
-    async def get_all():
-        return [test_agent]
-
-    api_app.db_manager.get_all_agent_statuses = get_all
+    monkeypatch.setattr(api_app.db_manager, "get_all_agent_statuses", _async_returning([test_agent]))
 
     response = client.get("/api/agents")
     assert response.status_code == 200
     assert "agents" in response.json()
 
-def test_get_agent():
+def test_get_agent(client, api_app, monkeypatch):
     """Test getting a specific agent."""
     # First create a test agent
     agent_id = str(uuid.uuid4())
@@ -100,7 +55,7 @@ def test_get_agent():
     async def get_status(aid: str):
         return agent if aid == agent_id else None
 
-    api_app.db_manager.get_agent_status = get_status
+    monkeypatch.setattr(api_app.db_manager, "get_agent_status", get_status)
     
     # Test existing agent
     response = client.get(f"/api/agents/{agent_id}")
@@ -111,7 +66,7 @@ def test_get_agent():
     response = client.get(f"/api/agents/{uuid.uuid4()}")
     assert response.status_code == 404
 
-def test_send_message():
+def test_send_message(client, api_app, monkeypatch):
     """Test sending a message."""
     message = AgentMessage(
         sender_id=uuid.uuid4(),
@@ -121,54 +76,60 @@ def test_send_message():
         content="Test message",
     )
 
-    async def publish(msg: AgentMessage):
-        return None
-
-    api_app.message_broker.publish = publish
+    monkeypatch.setattr(api_app.message_broker, "publish", _async_returning(None))
 
-    response = client.post("/api/messages", json=message.model_dump(mode="json"))
+    response = client.post(
+        "/api/messages",
+        content=message.model_dump_json(),
+        headers={"Content-Type": "application/json"},
+    )
     assert response.status_code == 200
     assert "message_id" in response.json()
 
-def test_get_messages():
+def test_get_messages(client, api_app, monkeypatch):
     """Test getting message history."""
     agent_id = str(uuid.uuid4())
 
     # Mock the message broker response
-    async def history(aid: str, **kwargs):
-        return []
-
-    api_app.message_broker.get_message_history = history
+    monkeypatch.setattr(api_app.message_broker, "get_message_history", _async_returning([]))
 
     response = client.get(f"/api/messages/{agent_id}")
     assert response.status_code == 200
     assert "messages" in response.json()
 
-def test_system_stats():
+def test_system_stats(client, api_app, monkeypatch):
     """Test getting system statistics."""
-    async def stats():
-        class GPU:
-            def __init__(self):
-                self.total_memory = 1
-                self.used_memory = 0
-                self.free_memory = 1
-                self.utilization = 0
-                self.temperature = 0
-                self.power_usage = 0
-                self.timestamp = "0"
-
-        return GPU()
+    gpu = types.SimpleNamespace(
+        total_memory=1,
+        used_memory=0,
+        free_memory=1,
+        utilization=0,
+        temperature=0,
+        power_usage=0,
+        timestamp="0",
+    )
 
-    api_app.gpu_manager.get_stats = stats
+    monkeypatch.setattr(api_app.gpu_manager, "get_stats", _async_returning(gpu))
 
     response = client.get("/api/system/stats")
     assert response.status_code == 200
     assert "gpu" in response.json()
     assert "timestamp" in response.json()
 
+@pytest.mark.slow
 @pytest.mark.asyncio
-async def test_websocket_connection():
+async def test_websocket_connection(client, api_app, monkeypatch):
     """Test WebSocket connection and message handling."""
+    monkeypatch.setattr(api_app.message_broker, "publish", _async_returning(None))
+
+    message = {
+        "type": "agent_message",
+        "sender_id": str(uuid.uuid4()),
+        "conversation_id": str(uuid.uuid4()),
+        "content": "Test message",
+        "message_type": "task"
+    }
+
     with client.websocket_connect("/ws/test-client") as websocket:
         # Test agent registration
         websocket.send_json({
@@ -179,22 +140,27 @@ async def test_websocket_connection():
         assert response["type"] == "registration_confirmed"
         assert response["agent_id"] == "test-agent"
 
-        # Test sending a message
-        message = {
-            "type": "agent_message",
-            "sender_id": "test-agent",
-            "content": "Test message",
-            "message_type": "text"
-        }
+        # Test sending a message; the sender gets its broadcast copy back
         websocket.send_json(message)
-
-        # The message should be broadcast back
         response = websocket.receive_json()
         assert response["type"] == "agent_message"
         assert response["content"] == "Test message"
 
+        # Test a batch: one frame in, one frame with every reply out
+        websocket.send_json({
+            "type": "batch",
+            "messages": [
+                {"type": "register_agent", "agent_id": "test-agent-2"},
+                message
+            ]
+        })
+        responses = websocket.receive_json()
+        assert [r["type"] for r in responses] == ["registration_confirmed", "agent_message"]
+        assert responses[0]["agent_id"] == "test-agent-2"
+        assert responses[1]["content"] == "Test message"
+
 
-def test_agent_lifecycle():
+def test_agent_lifecycle(client, api_app, monkeypatch):
     """Test start, stop and restart endpoints."""
     agent_id = str(uuid.uuid4())
 
@@ -210,8 +176,9 @@ def test_agent_lifecycle():
     async def update_status(status: AgentStatus):
         agent.state = status.state
 
-    api_app.db_manager.get_agent_status = get_status
-    api_app.db_manager.update_agent_status = update_status
+    monkeypatch.setattr(api_app.db_manager, "get_agent_status", get_status)
+    monkeypatch.setattr(api_app.db_manager, "update_agent_status", update_status)
+    monkeypatch.setattr(api_app.db_manager, "flush", _async_returning(None))
 
     response = client.post(f"/api/agents/{agent_id}/start")
     assert response.status_code == 200
@@ -0,0 +1,40 @@
+"""
+Tests for the SQLite database manager.
+"""
+
+from datetime import datetime, timedelta
+import uuid
+
+import pytest
+
+from ai_lab.core.database import DatabaseManager
+from ai_lab.models.base import AgentRole, AgentStatus
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_cleanup_inactive_agents_returns_removed_count():
+    """Test that only stale agents are removed and counted."""
+    # In-memory database: nothing here depends on on-disk behavior
+    manager = DatabaseManager(":memory:")
+    await manager.connect()
+    await manager._conn.execute("PRAGMA journal_mode = MEMORY")
+    await manager._conn.execute("PRAGMA synchronous = OFF")
+
+    try:
+        stale = datetime.utcnow() - timedelta(hours=48)
+        for _ in range(2):
+            await manager.update_agent_status(
+                AgentStatus(id=uuid.uuid4(), role=AgentRole.WORKER, last_updated=stale)
+            )
+        active = AgentStatus(id=uuid.uuid4(), role=AgentRole.QA)
+        await manager.update_agent_status(active)
+        await manager.flush()
+
+        assert await manager.cleanup_inactive_agents(max_age_hours=24) == 2
+        await manager.optimize()
+
+        remaining = await manager.get_all_agent_statuses()
+        assert [status.id for status in remaining] == [active.id]
+    finally:
+        await manager.disconnect()
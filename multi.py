@@ -1,10 +1,11 @@
 import asyncio
 from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.messages import TextMessage
-from autogen_core import CancellationToken
 from autogen_ext.models.ollama import OllamaChatCompletionClient
 from ollama import Options
 
+# Upper bound on the tokens in the system prompts and the task
+PREFIX_TOKENS = 512
+
 async def main():
     print("Initializing agents...")
     
@@ -14,7 +15,7 @@ async def main():
         num_thread=4,  # Number of CPU threads to use
         num_ctx=4096,  # Context window size
         num_batch=512,  # Batch size for processing
-        num_keep=32,  # Number of tokens to keep from the input
+        num_keep=PREFIX_TOKENS,  # Keep the system prompts and task when the context is truncated
         temperature=0.7,  # Sampling temperature
         top_k=40,  # Top-k sampling
         top_p=0.9  # Top-p sampling
@@ -23,71 +24,69 @@ async def main():
     client = OllamaChatCompletionClient(
         model="mistral:latest",
         options=gpu_options,
+        keep_alive="10m",  # Keep the model and its KV cache loaded between turns
         host="http://localhost:11434"  # Use the default Ollama port
     )
 
-    # Create the coder agent
+    # Create the coder agent; it keeps its own history across runs, so its
+    # revision only appends to the prefix Ollama already has cached
     coder = AssistantAgent(
         name="coder",
         model_client=client,
         description="A coding expert that can write and explain code",
-        system_message="You are a coding expert. Write clear, efficient, and well-documented code. Focus on performance and readability."
+        system_message="You are a coding expert. Write clear, efficient, and well-documented code. Focus on performance and readability. When critics give feedback, improve the code based on it, addressing all the points mentioned."
     )
     
-    # Create the critic agent
-    critic = AssistantAgent(
-        name="critic",
+    # Create the critic agents; their reviews are independent of each other
+    perf_critic = AssistantAgent(
+        name="perf_critic",
+        model_client=client,
+        description="A code reviewer focused on performance",
+        system_message="You are a code reviewer. Analyze code for efficiency. Pay special attention to time and space complexity and suggest potential optimizations."
+    )
+    style_critic = AssistantAgent(
+        name="style_critic",
         model_client=client,
-        description="A code reviewer that can analyze and improve code",
-        system_message="You are a code reviewer. Analyze code for efficiency, readability, and best practices. Pay special attention to time and space complexity."
+        description="A code reviewer focused on correctness and readability",
+        system_message="You are a code reviewer. Analyze code for readability and best practices. Pay special attention to edge case handling, code readability and documentation."
     )
 
     print("\nStarting the conversation...")
-    print("The coder will write code, and the critic will review it.")
+    print("The coder will write code, two critics will review it, and the coder will address the feedback.")
     
     # First, let's ask the coder to write code
     print("\nAsking the coder to write code...")
-    initial_message = TextMessage(
-        content="""Write a Python function that finds the longest common subsequence (LCS) of two strings. 
-        The function should be efficient and handle edge cases. Include example usage and time complexity analysis.""",
-        source="user"
-    )
-    
-    # Get response from coder
-    coder_response = await coder.on_messages([initial_message], CancellationToken())
-    print(f"\nCoder's response: {coder_response.chat_message.content}")
+    draft = await coder.run(task="""Write a Python function that finds the longest common subsequence (LCS) of two strings. 
+        The function should be efficient and handle edge cases. Include example usage and time complexity analysis.""")
+    code = draft.messages[-1].content
+    print(f"\nCoder's response: {code}")
 
-    # Now let's ask the critic to review the code
-    print("\nAsking the critic to review the code...")
-    review_message = TextMessage(
-        content=f"""Please review this code and suggest improvements. Focus on:
-        1. Time and space complexity
-        2. Edge case handling
-        3. Code readability and documentation
-        4. Potential optimizations
+    # Both reviews run concurrently over the shared client; Ollama overlaps
+    # them when OLLAMA_NUM_PARALLEL allows more than one request per model
+    print("\nAsking the critics to review the code...")
+    review_task = f"""Please review this code and suggest improvements.
         
         Here's the code to review:
-        {coder_response.chat_message.content}""",
-        source="user"
+        {code}"""
+    perf_review, style_review = await asyncio.gather(
+        perf_critic.run(task=review_task),
+        style_critic.run(task=review_task)
     )
-    
-    # Get response from critic
-    critic_response = await critic.on_messages([review_message], CancellationToken())
-    print(f"\nCritic's response: {critic_response.chat_message.content}")
+    feedback = {
+        "Performance": perf_review.messages[-1].content,
+        "Style": style_review.messages[-1].content
+    }
+    for name, review in feedback.items():
+        print(f"\n{name} critic's response: {review}")
 
-    # Let the coder respond to the critic's feedback
+    # Let the coder respond to the critics' feedback
     print("\nAsking the coder to respond to the feedback...")
-    feedback_message = TextMessage(
-        content=f"""The critic provided the following feedback:
-        {critic_response.chat_message.content}
+    reviews = "\n\n".join(f"{name} review:\n{review}" for name, review in feedback.items())
+    final = await coder.run(task=f"""The critics provided the following feedback:
+        {reviews}
         
-        Please improve the code based on this feedback, addressing all the points mentioned.""",
-        source="user"
-    )
-    
-    # Get final response from coder
-    final_response = await coder.on_messages([feedback_message], CancellationToken())
-    print(f"\nCoder's final response: {final_response.chat_message.content}")
+        Please improve the code based on this feedback, addressing all the points mentioned.""")
+    print(f"\nCoder's final response: {final.messages[-1].content}")
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
@@ -1,4 +1,4 @@
-import networkx as nx
+import numpy as np
 import plotly.graph_objects as go
 from typing import List, Tuple
 
@@ -24,28 +24,12 @@ class AgentVisualizer:
             ("QA", "Reflection"),
             ("Reflection", "CEO"),
         ]
-        self.animation_frames = [self.create_animation_frame([])]
 
-    def create_animation_frame(self, highlight: List[Tuple[str, str]]):
-        """Create a Plotly figure representing the agent graph.
+        # The graph never changes, so its traces and layout are built once
+        # and every frame only adds the highlight overlay
+        edge_x, edge_y = self._segments(self.edges)
 
-        Parameters
-        ----------
-        highlight: list of edges that should be emphasized in this frame.
-        """
-        G = nx.DiGraph()
-        G.add_nodes_from(self.nodes)
-        G.add_edges_from(self.edges)
-
-        edge_x = []
-        edge_y = []
-        for u, v in self.edges:
-            x0, y0 = self.pos[u]
-            x1, y1 = self.pos[v]
-            edge_x += [x0, x1, None]
-            edge_y += [y0, y1, None]
-
-        edge_trace = go.Scatter(
+        self._base_edge_trace = go.Scatter(
             x=edge_x,
             y=edge_y,
             line=dict(width=2, color="gray"),
@@ -55,7 +39,7 @@ class AgentVisualizer:
 
         node_x = [self.pos[n][0] for n in self.nodes]
         node_y = [self.pos[n][1] for n in self.nodes]
-        node_trace = go.Scatter(
+        self._base_node_trace = go.Scatter(
             x=node_x,
             y=node_y,
             mode="markers+text",
@@ -64,36 +48,76 @@ class AgentVisualizer:
             marker=dict(size=20, color="lightblue", line=dict(width=2, color="black")),
         )
 
-        fig = go.Figure(data=[edge_trace, node_trace])
-        # Highlight selected edges by adding them on top with a different color
-        if highlight:
-            hx = []
-            hy = []
-            for u, v in highlight:
-                x0, y0 = self.pos[u]
-                x1, y1 = self.pos[v]
-                hx += [x0, x1, None]
-                hy += [y0, y1, None]
-            fig.add_trace(
-                go.Scatter(
-                    x=hx,
-                    y=hy,
-                    line=dict(width=4, color="red"),
-                    hoverinfo="none",
-                    mode="lines",
-                )
-            )
-        fig.update_layout(
+        self._base_layout = dict(
             showlegend=False,
             xaxis=dict(showgrid=False, zeroline=False, visible=False),
             yaxis=dict(showgrid=False, zeroline=False, visible=False),
             margin=dict(l=20, r=20, t=20, b=20),
         )
-        return fig
 
-    def animate_flow(self, flow: List[List[Tuple[str, str]]]):
-        """Create animation frames for a sequence of edge transitions."""
-        frames = [self.create_animation_frame([])]
-        for step in flow:
-            frames.append(self.create_animation_frame(step))
-        self.animation_frames = frames
+        self.animate_flow([])
+
+    def _segments(self, edges: List[Tuple[str, str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Line coordinates for the given edges, one NaN-separated segment per edge."""
+        xs = np.empty(3 * len(edges))
+        ys = np.empty(3 * len(edges))
+        for i, (u, v) in enumerate(edges):
+            xs[3 * i], ys[3 * i] = self.pos[u]
+            xs[3 * i + 1], ys[3 * i + 1] = self.pos[v]
+        # Plotly breaks the line at NaN the same way it does at None
+        xs[2::3] = np.nan
+        ys[2::3] = np.nan
+        return xs, ys
+
+    def _highlight_trace(self, highlight: List[Tuple[str, str]]) -> go.Scatter:
+        """Red overlay trace for the given edges."""
+        hx, hy = self._segments(highlight)
+        return go.Scatter(
+            x=hx,
+            y=hy,
+            line=dict(width=4, color="red"),
+            hoverinfo="none",
+            mode="lines",
+        )
+
+    def create_animation_frame(self, highlight: List[Tuple[str, str]]):
+        """Create a Plotly figure representing the agent graph.
+
+        Parameters
+        ----------
+        highlight: list of edges that should be emphasized in this frame.
+        """
+        data = [self._base_edge_trace, self._base_node_trace]
+        # Highlight selected edges by adding them on top with a different color
+        if highlight:
+            data.append(self._highlight_trace(highlight))
+        # Figure copies the traces, so the cached ones are never modified
+        return go.Figure(data=data, layout=self._base_layout)
+
+    def animate_flow(self, flow: List[List[Tuple[str, str]]], frame_duration: int = 500):
+        """Create one animated figure for a sequence of edge transitions.
+
+        Parameters
+        ----------
+        flow: edges to highlight at each step, after an initial unhighlighted frame.
+        frame_duration: milliseconds each step is shown for.
+
+        Every frame replaces only the highlight trace (index 2), so the browser
+        animates the figure without redrawing the base graph.
+        """
+        steps = [[]] + list(flow)
+        frames = [
+            go.Frame(data=[self._highlight_trace(step)], traces=[2], name=str(i))
+            for i, step in enumerate(steps)
+        ]
+        play = dict(
+            label="Play",
+            method="animate",
+            args=[None, dict(frame=dict(duration=frame_duration, redraw=False), transition=dict(duration=0), fromcurrent=True)],
+        )
+        self.animation_figure = go.Figure(
+            data=[self._base_edge_trace, self._base_node_trace, self._highlight_trace([])],
+            layout=dict(self._base_layout, updatemenus=[dict(type="buttons", showactive=False, buttons=[play])]),
+            frames=frames,
+        )
+        return self.animation_figure